@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# Fixtures communes aux tests : un cluster PostgreSQL jetable démarré avec
+# pgserver pour toute la session, et des bases recréées à la demande
+
+import subprocess
+
+import psycopg2
+import pytest
+
+
+@pytest.fixture(scope='session')
+def pg_server(tmp_path_factory):
+    """Paramètres de connexion (sans base) d'un cluster temporaire, supprimé en fin de session"""
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(tmp_path_factory.mktemp('pgdata'), cleanup_mode='delete')
+    info = server.get_postmaster_info()
+    yield {
+        'host': str(info.socket_dir) if info.socket_dir else info.hostname,
+        'port': info.port,
+        'user': 'postgres',
+        'password': ''
+    }
+    server.cleanup()
+
+
+@pytest.fixture
+def create_database(pg_server):
+    """Recrée une base vide et y exécute le script SQL donné ; retourne son nom"""
+    def create(name, sql=None):
+        admin = psycopg2.connect(**pg_server, database='postgres')
+        admin.autocommit = True
+        try:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP DATABASE IF EXISTS {name}")
+                cur.execute(f"CREATE DATABASE {name}")
+        finally:
+            admin.close()
+        if sql:
+            conn = psycopg2.connect(**pg_server, database=name)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql)
+                conn.commit()
+            finally:
+                conn.close()
+        return name
+
+    return create
+
+
+@pytest.fixture
+def run_psql(pg_server):
+    """Exécute des scripts SQL avec psql, en s'arrêtant à la première erreur"""
+    commands = pytest.importorskip('pgserver._commands')
+
+    def run(database, *script_files):
+        command = [str(commands.POSTGRES_BIN_PATH / 'psql'), '-X', '-q', '-v', 'ON_ERROR_STOP=1',
+                   '-h', pg_server['host'], '-p', str(pg_server['port']), '-U', pg_server['user'],
+                   '-d', database]
+        for script_file in script_files:
+            command += ['-f', str(script_file)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    return run
+
+
+@pytest.fixture
+def query(pg_server):
+    """Retourne toutes les lignes d'une requête sur une base"""
+    def run(database, sql, params=None):
+        conn = psycopg2.connect(**pg_server, database=database)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if cur.description else None
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    return run
@@ -1,16 +1,193 @@
 import os
 import pandas as pd
 import psycopg2
+import psycopg2.errors
 from psycopg2 import Error
-from datetime import datetime
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 import argparse
 import time
 import shutil  # Import the shutil module for moving files
+import io
+import multiprocessing
+import queue
+import threading
+
+# Correspondance en-tête CSV -> colonne de transactions, avec le type de conversion
+COLUMN_MAPPING = (
+    ('Guichet', 'guichet', 'text'), ('Agence', 'agence', 'text'),
+    ('Compagnie', 'compagnie', 'text'), ('Groupe', 'groupe', 'text'),
+    ('Service', 'service', 'text'), ('Reférence', 'reference', 'text'),
+    ('Ref Partenaire', 'ref_partenaire', 'text'), ('ID Trx Partenaire', 'id_trx_partenaire', 'text'),
+    ('Référence EG', 'reference_eg', 'text'), ('Expéditeur', 'expediteur', 'text'),
+    ('Bénéficiaire', 'beneficiaire', 'text'), ('IdProofBenef', 'id_proof_benef', 'text'),
+    ('Src.', 'source', 'text'), ('Dest.', 'destination', 'text'),
+    ('Dev. Src', 'devise_source', 'text'), ('Numéro Compte', 'numero_compte', 'text'),
+    ('Intitulé Compte', 'intitule_compte', 'text'), ('Com_Gui_Envoyeur', 'com_gui_envoyeur', 'numeric'),
+    ('Com_Age_Envoyeur', 'com_age_envoyeur', 'numeric'), ('Com_Cmp_Envoyeur', 'com_cmp_envoyeur', 'numeric'),
+    ('Com_Grp_Envoyeur', 'com_grp_envoyeur', 'numeric'), ('Com_Grp_Envoyeur_Dev', 'com_grp_envoyeur_dev', 'numeric'),
+    ('Com_Sys_Envoie', 'com_sys_envoie', 'numeric'), ('Com_Sys_Envoie_Dev', 'com_sys_envoie_dev', 'numeric'),
+    ('Montant', 'montant', 'numeric'), ('Frais HT', 'frais_ht', 'numeric'), ('TVA', 'tva', 'numeric'),
+    ('Autres taxes', 'autres_taxes', 'numeric'), ('Frais TTC', 'frais_ttc', 'numeric'), ('Total', 'total', 'numeric'),
+    ('Dev. Dest', 'devise_destination', 'text'), ('Montant à percevoir', 'montant_a_percevoir', 'numeric'),
+    ('Date', 'date_transaction', 'date'),
+    ('Date Paiement', 'date_paiement', 'date'),
+    ('Date Annulation', 'date_annulation', 'date'),
+    ('Date Remboursement', 'date_remboursement', 'date'),
+    ('Date Dernière Modification', 'date_derniere_modification', 'date'),
+    ('Statut', 'statut', 'text'), ('Guichet Payeur', 'guichet_payeur', 'text'),
+    ('Agence Payeur', 'agence_payeur', 'text'), ('Compagnie Payeur', 'compagnie_payeur', 'text'),
+    ('Groupe Payeur', 'groupe_payeur', 'text'), ('Com_Gui_Payeur', 'com_gui_payeur', 'numeric'),
+    ('Com_Age_Payeur', 'com_age_payeur', 'numeric'), ('Com_Cmp_Payeur', 'com_cmp_payeur', 'numeric'),
+    ('Com_Grp_Payeur', 'com_grp_payeur', 'numeric'), ('Com_Grp_Payeur_Dev', 'com_grp_payeur_dev', 'numeric'),
+    ('Com_Sys_Paiement', 'com_sys_paiement', 'numeric'), ('Com_Sys_Paiement_Dev', 'com_sys_paiement_dev', 'numeric'),
+    ('Autres Taxe P', 'autres_taxe_p', 'numeric'), ('Remise', 'remise', 'numeric'),
+    ('Guichetier', 'guichetier', 'text'), ('Guichetier Payeur', 'guichetier_payeur', 'text'),
+    ('TEC', 'tec', 'numeric'), ('Commission Partenaire', 'commission_partenaire', 'numeric'),
+    ('TEC Partenaire', 'tec_partenaire', 'numeric'), ('Status Partenaire', 'status_partenaire', 'text'),
+)
+TRANSACTION_COLUMNS = tuple(column for _, column, _ in COLUMN_MAPPING)
+
+# Formats de date acceptés, essayés dans l'ordre
+DATE_FORMATS = [
+    '%d-%m-%Y %H:%M:%S',  # Format principal
+    '%Y-%m-%d %H:%M:%S',  # Format alternatif
+    '%d/%m/%Y %H:%M'      # Autre format possible
+]
+
+# Lignes lues, converties et chargées à la fois : la mémoire ne dépend pas de la taille du fichier
+CHUNK_ROWS = 50000
+
+# Séparateur des deux parties d'une clé (service, reference) dans l'index en mémoire
+KEY_SEPARATOR = '\x1f'
+
+INSERT_QUERY = f"INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) VALUES %s"
+
+# Table de transit de l'import en bloc : colonnes de transactions sans leurs
+# contraintes, plus le numéro de ligne dans le fichier CSV
+CREATE_STAGING_QUERY = f"""
+CREATE TEMP TABLE staging_transactions ON COMMIT DROP AS
+SELECT NULL::integer AS ligne, {', '.join(TRANSACTION_COLUMNS)}
+FROM transactions WITH NO DATA
+"""
+
+# Insère la première occurrence de chaque (service, reference), dans l'ordre des
+# clés pour que deux imports en parallèle verrouillent les clés dans le même ordre
+# (pas d'interblocage), puis retourne les lignes écartées comme doublons : first_line vaut
+# NULL pour une opération déjà en base, sinon la ligne de sa première occurrence.
+# Une clé incomplète (NULL) ne peut pas être en conflit : ces lignes sont toutes insérées.
+BULK_INSERT_QUERY = f"""
+WITH inserted AS (
+    INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)})
+    SELECT {', '.join(TRANSACTION_COLUMNS)} FROM (
+        SELECT DISTINCT ON (service, reference, CASE WHEN service IS NULL OR reference IS NULL THEN ligne END) *
+        FROM staging_transactions
+        ORDER BY service, reference, CASE WHEN service IS NULL OR reference IS NULL THEN ligne END, ligne
+    ) first_rows
+    ORDER BY service, reference
+    ON CONFLICT (service, reference) DO NOTHING
+    RETURNING service, reference
+),
+first_lines AS (
+    SELECT service, reference, min(ligne) AS first_line
+    FROM staging_transactions
+    WHERE service IS NOT NULL AND reference IS NOT NULL
+    GROUP BY service, reference
+)
+SELECT s.ligne, s.service, s.reference,
+       CASE WHEN i.service IS NOT NULL THEN f.first_line END AS first_line
+FROM staging_transactions s
+JOIN first_lines f ON f.service = s.service AND f.reference = s.reference
+LEFT JOIN inserted i ON i.service = s.service AND i.reference = s.reference
+WHERE i.service IS NULL OR s.ligne > f.first_line
+ORDER BY s.ligne
+"""
+
+
+def convert_text(series):
+    """Colonne texte : valeurs inchangées, cellules vides -> None"""
+    return series.astype(object).where(series.notna(), None)
+
+
+def convert_numeric(series):
+    """Colonne numérique : virgule décimale acceptée, valeur invalide -> NaN"""
+    return pd.to_numeric(series.str.replace(',', '.', regex=False), errors='coerce').astype(float)
+
+
+def convert_date(series):
+    """Colonne de dates : chaque format n'est essayé que sur les valeurs encore non reconnues"""
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    for date_format in DATE_FORMATS:
+        missing = result.isna() & series.notna()
+        if not missing.any():
+            break
+        result[missing] = pd.to_datetime(series[missing], format=date_format, errors='coerce')
+    return result
+
+
+CONVERTERS = {'text': convert_text, 'numeric': convert_numeric, 'date': convert_date}
+
+
+def copy_column(series):
+    """Formate une colonne convertie pour le format texte de COPY (valeur manquante -> \\N)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    elif pd.api.types.is_numeric_dtype(series):
+        text = series.astype(str)
+    else:
+        text = (series.astype(str)
+                .str.replace('\\', '\\\\', regex=False).str.replace('\t', '\\t', regex=False)
+                .str.replace('\n', '\\n', regex=False).str.replace('\r', '\\r', regex=False))
+    return text.where(series.notna(), '\\N')
+
+
+def read_csv_chunks(file_path, chunk_rows):
+    """Ouvre la lecture d'un fichier CSV par tranches de chunk_rows lignes"""
+    # Tout est lu comme du texte : les types sont fixés par COLUMN_MAPPING.
+    # Les clés (service, reference) restent le texte exact du CSV, celui que
+    # l'ancien import (types déduits par pandas) enregistrait : une colonne
+    # déduite numérique y échouait sur « text = integer » et n'était jamais
+    # insérée. Les cellules vides et marqueurs NA sont traités comme avant.
+    return pd.read_csv(file_path, encoding='utf-8', dtype=str, chunksize=chunk_rows)
+
+
+def convert_chunk(df):
+    """Convertit une tranche lue du CSV"""
+    if '#' in df.columns:
+        df = df.drop('#', axis=1)
+    return TransactionImporter.convert_columns(df)
+
+
+def convert_file(file_path, chunk_rows, chunks):
+    """Lit et convertit un fichier CSV tranche par tranche (exécuté dans le processus de lecture du fichier)
+
+    Chaque tranche convertie est déposée dans la file bornée chunks : la
+    lecture garde une tranche d'avance sur l'import. None marque la fin du
+    fichier ; une erreur de lecture est transmise à la place d'une tranche.
+    """
+    try:
+        with read_csv_chunks(file_path, chunk_rows) as reader:
+            for df in reader:
+                chunks.put(convert_chunk(df))
+    except Exception as e:
+        chunks.put(e)
+        return
+    chunks.put(None)
+
 
 class TransactionImporter:
-    def __init__(self, test_mode=False):
+    def __init__(self, test_mode=False, bulk=False, workers=1, chunk_rows=CHUNK_ROWS):
         self.test_mode = test_mode
+        self.bulk = bulk
+        self.workers = max(1, workers)
+        self.chunk_rows = max(1, chunk_rows)
+        # Index en mémoire des clés service + KEY_SEPARATOR + reference
+        self.existing_keys = set()  # Clés en base sur les jours de loaded_days
+        self.loaded_days = set()    # Jours de date_transaction déjà chargés (ou en cours)
+        self.file_keys = {}         # Par fichier en cours : clés importées -> ligne
+        self.keys_lock = threading.Lock()  # Accès partagé des workers à l'index
         self.report_data = {
             'start_time': None,
             'end_time': None,
@@ -34,7 +211,14 @@ class TransactionImporter:
         return cur.fetchone()[0]
 
     def import_transactions(self):
-        """Importe les transactions depuis les fichiers CSV vers la base de données"""
+        """Importe les transactions depuis les fichiers CSV vers la base de données
+
+        Chaque fichier est lu par tranches de chunk_rows lignes. Avec plusieurs
+        workers, les fichiers sont importés en parallèle, chacun sur une
+        connexion du pool (au plus `workers` connexions), et chaque fichier en
+        cours est lu et converti dans son propre processus. L'unicité des clés
+        reste garantie par la contrainte (service, reference) de la base.
+        """
         db_params = {
             'dbname': 'db_hswa',
             'user': 'postgres',
@@ -44,11 +228,10 @@ class TransactionImporter:
         }
 
         self.report_data['start_time'] = datetime.now()
-        conn = None
+        connection_pool = None
 
         try:
-            conn = psycopg2.connect(**db_params)
-            cur = conn.cursor()
+            connection_pool = ThreadedConnectionPool(1, self.workers, **db_params)
             print("Connexion à la base de données établie.")
 
             folder_path = Path.home() / 'documents' / 'etats_bruts'
@@ -61,205 +244,359 @@ class TransactionImporter:
 
             csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
 
-            for csv_file in csv_files:
-                file_data = {
-                    'filename': csv_file,
-                    'rows_processed': 0,
-                    'rows_success': 0,
-                    'rows_failed': 0,
-                    'errors': []
-                }
-
-                file_path = folder_path / csv_file
-                print(f"Traitement du fichier: {csv_file}")
-
-                try:
-                    df = pd.read_csv(file_path, encoding='utf-8')
-                    if '#' in df.columns:
-                        df = df.drop('#', axis=1)
-
-                    file_data['rows_processed'] = len(df)
-                    self.report_data['total_rows'] += len(df)
-
-                    # Traitement ligne par ligne avec transaction individuelle
-                    for index, row in df.iterrows():
-                        try:
-                            # Vérification préalable de l'existence
-                            service = row.get('Service')
-                            reference = row.get('Reférence')
-
-                            # Si la transaction existe déjà, on l'ignore
-                            if self.check_transaction_exists(cur, service, reference):
-                                raise ValueError(f"L'opération {service} de référence {reference} existe déjà")
-
-                            insert_query = """
-                            INSERT INTO transactions (
-                                guichet, agence, compagnie, groupe, service, reference,
-                                ref_partenaire, id_trx_partenaire, reference_eg, expediteur,
-                                beneficiaire, id_proof_benef, source, destination, devise_source,
-                                numero_compte, intitule_compte, com_gui_envoyeur, com_age_envoyeur,
-                                com_cmp_envoyeur, com_grp_envoyeur, com_grp_envoyeur_dev,
-                                com_sys_envoie, com_sys_envoie_dev, montant, frais_ht, tva,
-                                autres_taxes, frais_ttc, total, devise_destination,
-                                montant_a_percevoir, date_transaction, date_paiement,
-                                date_annulation, date_remboursement, date_derniere_modification,
-                                statut, guichet_payeur, agence_payeur, compagnie_payeur,
-                                groupe_payeur, com_gui_payeur, com_age_payeur, com_cmp_payeur,
-                                com_grp_payeur, com_grp_payeur_dev, com_sys_paiement,
-                                com_sys_paiement_dev, autres_taxe_p, remise, guichetier,
-                                guichetier_payeur, tec, commission_partenaire, tec_partenaire,
-                                status_partenaire
-                            ) VALUES %s
-                            """
-
-                            values = self.prepare_values(row)
-                            formatted_values = '(' + ','.join(['%s'] * len(values)) + ')'
-
-                            if not self.test_mode:
-                                cur.execute(insert_query % formatted_values, values)
-                                conn.commit()  # Commit après chaque insertion réussie
-
-                            file_data['rows_success'] += 1
-                            self.report_data['successful_rows'] += 1
-
-                        except ValueError as ve:
-                            # Erreur de doublon détectée lors de la vérification
-                            file_data['rows_failed'] += 1
-                            self.report_data['failed_rows'] += 1
-                            error_info = {
-                                'row': index + 2,
-                                'message': str(ve),
-                                'is_duplicate': True # Mark as duplicate error
-                            }
-                            file_data['errors'].append(error_info)
-
-                        except Exception as row_error:
-                            # Autres erreurs
-                            file_data['rows_failed'] += 1
-                            self.report_data['failed_rows'] += 1
-                            error_info = {
-                                'row': index + 2,
-                                'message': str(row_error),
-                                'is_duplicate': False # Mark as not duplicate error
-                            }
-                            file_data['errors'].append(error_info)
-                            if not self.test_mode:
-                                conn.rollback()  # Rollback en cas d'erreur
-
-                    print(f"Traitement terminé pour {csv_file}")
-                    # Move file if no *critical* errors (excluding duplicates)
-                    has_critical_errors = any(not error.get('is_duplicate', False) for error in file_data['errors'])
-                    if not has_critical_errors:
-                        processed_file_path = processed_folder / csv_file
-                        # Add suffix to processed filename
-                        file_name, file_ext = os.path.splitext(csv_file)
-                        suffixed_file_name = f"{file_name}_traité{file_ext}"
-                        processed_file_path_suffixed = processed_folder / suffixed_file_name
-
-                        source_path_str = str(file_path) # Ensure path is string for shutil.move
-                        destination_path_str = str(processed_file_path_suffixed) # Use suffixed path for moving
-
-                        try:
-                            shutil.move(source_path_str, destination_path_str)
-                            print(f"Fichier déplacé vers: {destination_path_str}")
-                        except Exception as e:
-                            file_data['errors'].append({'row': 'File Move', 'message': f"Erreur lors du déplacement du fichier vers {destination_path_str}: {str(e)}", 'is_duplicate': False})
-                            print(f"Erreur lors du déplacement du fichier vers {destination_path_str}: {e}")
-                    else:
-                        print(f"Fichier non déplacé en raison d'erreurs critiques lors du traitement.")
-
-
-                except Exception as file_error:
-                    self.report_data['errors'].append(f"Erreur sur le fichier {csv_file}: {str(file_error)}")
-
-                self.report_data['files_processed'].append(file_data)
+            if self.workers > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as writers:
+                    imports = [writers.submit(self.import_file, connection_pool, folder_path, processed_folder,
+                                              csv_file)
+                               for csv_file in csv_files]
+                    for future in imports:
+                        self.report_data['files_processed'].append(future.result())
+            else:
+                for csv_file in csv_files:
+                    self.report_data['files_processed'].append(self.import_file(
+                        connection_pool, folder_path, processed_folder, csv_file))
 
         except Error as e:
             self.report_data['errors'].append(f"Erreur de connexion PostgreSQL: {str(e)}")
 
         finally:
-            if conn:
-                cur.close()
-                conn.close()
+            if connection_pool:
+                connection_pool.closeall()
                 print("Connexion à la base de données fermée.")
 
+            # Totaux calculés à partir du détail par fichier, rempli par chaque worker
+            for total, key in (('total_rows', 'rows_processed'), ('successful_rows', 'rows_success'),
+                               ('failed_rows', 'rows_failed')):
+                self.report_data[total] = sum(file_data[key] for file_data in self.report_data['files_processed'])
             self.report_data['end_time'] = datetime.now()
             report_path = self.generate_report()
             print(f"Rapport d'importation généré: {report_path}")
 
-    def prepare_values(self, row):
-        """Prépare et convertit les valeurs pour l'insertion"""
-        def convert_numeric(value):
-            if pd.isna(value):
-                return None
-            if isinstance(value, str):
-                value = value.replace(',', '.')
-            try:
-                return float(value)
-            except ValueError:
-                return None
-
-        def convert_status_partenaire(status_str):
-            """Convertit le statut partenaire en numérique (si possible)."""
-            status_mapping = {
-                "CONFIRMED": "CONFIRMED",
-                "CREATED": "CREATED",
-                "Annulé": "Annulé"
-            }
-            return status_mapping.get(status_str, status_str) # return original if not found
-
-        return (
-            row.get('Guichet'), row.get('Agence'),
-            row.get('Compagnie'), row.get('Groupe'), row.get('Service'),
-            row.get('Reférence'), row.get('Ref Partenaire'),
-            row.get('ID Trx Partenaire'), row.get('Référence EG'),
-            row.get('Expéditeur'), row.get('Bénéficiaire'),
-            row.get('IdProofBenef'), row.get('Src.'), row.get('Dest.'),
-            row.get('Dev. Src'), row.get('Numéro Compte'),
-            row.get('Intitulé Compte'), convert_numeric(row.get('Com_Gui_Envoyeur')),
-            convert_numeric(row.get('Com_Age_Envoyeur')), convert_numeric(row.get('Com_Cmp_Envoyeur')),
-            convert_numeric(row.get('Com_Grp_Envoyeur')), convert_numeric(row.get('Com_Grp_Envoyeur_Dev')),
-            convert_numeric(row.get('Com_Sys_Envoie')), convert_numeric(row.get('Com_Sys_Envoie_Dev')),
-            convert_numeric(row.get('Montant')), convert_numeric(row.get('Frais HT')), convert_numeric(row.get('TVA')),
-            convert_numeric(row.get('Autres taxes')), convert_numeric(row.get('Frais TTC')), convert_numeric(row.get('Total')),
-            row.get('Dev. Dest'), convert_numeric(row.get('Montant à percevoir')),
-            self.convert_date(row.get('Date')),
-            self.convert_date(row.get('Date Paiement')),
-            self.convert_date(row.get('Date Annulation')),
-            self.convert_date(row.get('Date Remboursement')),
-            self.convert_date(row.get('Date Dernière Modification')),
-            row.get('Statut'), row.get('Guichet Payeur'),
-            row.get('Agence Payeur'), row.get('Compagnie Payeur'),
-            row.get('Groupe Payeur'), convert_numeric(row.get('Com_Gui_Payeur')),
-            convert_numeric(row.get('Com_Age_Payeur')), convert_numeric(row.get('Com_Cmp_Payeur')),
-            convert_numeric(row.get('Com_Grp_Payeur')), convert_numeric(row.get('Com_Grp_Payeur_Dev')),
-            convert_numeric(row.get('Com_Sys_Paiement')), convert_numeric(row.get('Com_Sys_Paiement_Dev')),
-            convert_numeric(row.get('Autres Taxe P')), convert_numeric(row.get('Remise')),
-            row.get('Guichetier'), row.get('Guichetier Payeur'),
-            convert_numeric(row.get('TEC')), convert_numeric(row.get('Commission Partenaire')),
-            convert_numeric(row.get('TEC Partenaire')), convert_status_partenaire(row.get('Status Partenaire')) # Apply conversion here
-        )
+    def import_file(self, connection_pool, folder_path, processed_folder, csv_file):
+        """Importe un fichier sur une connexion du pool et le déplace s'il n'a pas d'erreur critique
 
-    @staticmethod
-    def convert_date(date_str):
-        """Convertit une chaîne de date en objet datetime"""
-        if pd.isna(date_str):
-            return None
+        Les tranches du fichier sont importées l'une après l'autre (une
+        transaction par tranche en mode bloc). Retourne le détail de l'import
+        du fichier pour le rapport.
+        """
+        file_data = {
+            'filename': csv_file,
+            'rows_processed': 0,
+            'rows_success': 0,
+            'rows_failed': 0,
+            'errors': []
+        }
 
-        date_formats = [
-            '%d-%m-%Y %H:%M:%S',  # Format principal
-            '%Y-%m-%d %H:%M:%S',  # Format alternatif
-            '%d/%m/%Y %H:%M'      # Autre format possible
-        ]
+        file_path = folder_path / csv_file
+        print(f"Traitement du fichier: {csv_file}")
+        self.file_keys[csv_file] = {}
 
-        for date_format in date_formats:
+        try:
+            conn = connection_pool.getconn()
             try:
-                return datetime.strptime(str(date_str), date_format)
-            except ValueError:
-                continue
+                with conn.cursor() as cur:
+                    for converted in self.iter_converted_chunks(file_path):
+                        file_data['rows_processed'] += len(converted)
+                        self.load_existing_keys(conn, converted)
+                        converted = self.skip_known_duplicates(converted, file_data)
+                        if self.bulk and not converted.empty:
+                            self.import_rows_bulk(conn, cur, converted, file_data)
+                        elif not converted.empty:
+                            self.import_rows(conn, cur, converted, file_data)
+                        print(f"{csv_file}: {file_data['rows_processed']} lignes traitées")
+            finally:
+                connection_pool.putconn(conn, close=bool(conn.closed))
+                # Les doublons avec un fichier déjà importé sont signalés par la base
+                del self.file_keys[csv_file]
+            file_data['errors'].sort(key=lambda error: error['row'])
+
+            print(f"Traitement terminé pour {csv_file}")
+            # Move file if no *critical* errors (excluding duplicates)
+            has_critical_errors = any(not error.get('is_duplicate', False) for error in file_data['errors'])
+            if not has_critical_errors:
+                processed_file_path = processed_folder / csv_file
+                # Add suffix to processed filename
+                file_name, file_ext = os.path.splitext(csv_file)
+                suffixed_file_name = f"{file_name}_traité{file_ext}"
+                processed_file_path_suffixed = processed_folder / suffixed_file_name
+
+                source_path_str = str(file_path) # Ensure path is string for shutil.move
+                destination_path_str = str(processed_file_path_suffixed) # Use suffixed path for moving
+
+                try:
+                    shutil.move(source_path_str, destination_path_str)
+                    print(f"Fichier déplacé vers: {destination_path_str}")
+                except Exception as e:
+                    file_data['errors'].append({'row': 'File Move', 'message': f"Erreur lors du déplacement du fichier vers {destination_path_str}: {str(e)}", 'is_duplicate': False})
+                    print(f"Erreur lors du déplacement du fichier vers {destination_path_str}: {e}")
+            else:
+                print(f"Fichier non déplacé en raison d'erreurs critiques lors du traitement.")
 
+
+        except Exception as file_error:
+            self.report_data['errors'].append(f"Erreur sur le fichier {csv_file}: {str(file_error)}")
+
+        return file_data
+
+    def iter_converted_chunks(self, file_path):
+        """Produit les tranches converties d'un fichier CSV, de chunk_rows lignes chacune
+
+        La tranche suivante est lue et convertie pendant l'import de la
+        précédente : dans un thread avec un seul worker, sinon dans un
+        processus de lecture propre au fichier (voir convert_file), qui ne
+        renvoie que les tranches converties. L'index des tranches continue
+        d'une tranche à l'autre, index + 2 reste le numéro de ligne du fichier.
+        """
+        if self.workers > 1:
+            yield from self.iter_chunks_from_process(file_path)
+            return
+
+        reader = read_csv_chunks(file_path, self.chunk_rows)
+
+        def read_next():
+            df = next(reader, None)
+            return None if df is None else convert_chunk(df)
+
+        with reader, ThreadPoolExecutor(max_workers=1) as prefetch:
+            next_chunk = prefetch.submit(read_next)
+            while True:
+                converted = next_chunk.result()
+                if converted is None:
+                    return
+                next_chunk = prefetch.submit(read_next)
+                yield converted
+
+    def iter_chunks_from_process(self, file_path):
+        """Produit les tranches converties par le processus de lecture d'un fichier"""
+        chunks = multiprocessing.Queue(maxsize=1)
+        reader = multiprocessing.Process(target=convert_file, args=(file_path, self.chunk_rows, chunks),
+                                         daemon=True)
+        reader.start()
+        try:
+            while True:
+                try:
+                    converted = chunks.get(timeout=1)
+                except queue.Empty:
+                    if reader.is_alive():
+                        continue
+                    # Processus terminé : ce qu'il a écrit est déjà dans la file
+                    try:
+                        converted = chunks.get_nowait()
+                    except queue.Empty:
+                        raise RuntimeError(f"Lecture de {file_path.name} interrompue (code {reader.exitcode})")
+                if converted is None:
+                    return
+                if isinstance(converted, Exception):
+                    raise converted
+                yield converted
+        finally:
+            # Import arrêté avant la fin du fichier : la lecture n'a plus lieu d'être
+            if reader.is_alive():
+                reader.terminate()
+            reader.join()
+
+    def import_rows(self, conn, cur, converted, file_data):
+        """Importe les lignes converties d'un fichier une par une, avec une transaction par ligne"""
+        service_index = TRANSACTION_COLUMNS.index('service')
+        reference_index = TRANSACTION_COLUMNS.index('reference')
+
+        # Traitement ligne par ligne avec transaction individuelle
+        for index, values in zip(converted.index, self.row_values(converted)):
+            try:
+                # Vérification préalable de l'existence
+                service = values[service_index]
+                reference = values[reference_index]
+
+                # Si la transaction existe déjà, on l'ignore
+                known = self.known_duplicate(service, reference, file_data['filename'])
+                if known:
+                    raise ValueError(known)
+                if self.check_transaction_exists(cur, service, reference):
+                    raise ValueError(f"L'opération {service} de référence {reference} existe déjà")
+
+                formatted_values = '(' + ','.join(['%s'] * len(values)) + ')'
+
+                if not self.test_mode:
+                    cur.execute(INSERT_QUERY % formatted_values, values)
+                    conn.commit()  # Commit après chaque insertion réussie
+
+                file_data['rows_success'] += 1
+                self.remember_key(service, reference, file_data['filename'], index + 2)
+
+            except psycopg2.errors.UniqueViolation:
+                # Clé insérée entre-temps par un autre worker : la contrainte de la base fait foi
+                conn.rollback()
+                file_data['rows_failed'] += 1
+                file_data['errors'].append({
+                    'row': index + 2,
+                    'message': f"L'opération {service} de référence {reference} existe déjà",
+                    'is_duplicate': True
+                })
+
+            except ValueError as ve:
+                # Erreur de doublon détectée lors de la vérification
+                file_data['rows_failed'] += 1
+                error_info = {
+                    'row': index + 2,
+                    'message': str(ve),
+                    'is_duplicate': True # Mark as duplicate error
+                }
+                file_data['errors'].append(error_info)
+
+            except Exception as row_error:
+                # Autres erreurs
+                file_data['rows_failed'] += 1
+                error_info = {
+                    'row': index + 2,
+                    'message': str(row_error),
+                    'is_duplicate': False # Mark as not duplicate error
+                }
+                file_data['errors'].append(error_info)
+                if not self.test_mode:
+                    conn.rollback()  # Rollback en cas d'erreur
+
+    def import_rows_bulk(self, conn, cur, converted, file_data):
+        """Importe les lignes d'un fichier en bloc, dans une seule transaction
+
+        Les lignes converties sont chargées par COPY dans une table temporaire,
+        puis un seul INSERT ... ON CONFLICT (service, reference) DO NOTHING
+        insère les nouvelles opérations. Les doublons (déjà en base ou répétés
+        dans le fichier) sont déduits de la différence entre la table
+        temporaire et les lignes insérées. En cas d'erreur, le fichier est
+        repris ligne par ligne pour identifier les lignes fautives.
+        """
+        try:
+            lines = copy_column(pd.Series(converted.index + 2, index=converted.index)).str.cat(
+                [copy_column(converted[column]) for column in TRANSACTION_COLUMNS], sep='\t')
+            buffer = io.StringIO('\n'.join(lines) + '\n')
+
+            cur.execute(CREATE_STAGING_QUERY)
+            cur.copy_expert(f"COPY staging_transactions (ligne, {', '.join(TRANSACTION_COLUMNS)}) FROM STDIN", buffer)
+            cur.execute(BULK_INSERT_QUERY)
+            duplicates = cur.fetchall()
+            if self.test_mode:
+                conn.rollback()  # Mode test : doublons détectés mais rien n'est inséré
+            else:
+                conn.commit()
+        except Exception as bulk_error:
+            conn.rollback()
+            print(f"Import en bloc impossible ({bulk_error}), reprise ligne par ligne")
+            self.import_rows(conn, cur, converted, file_data)
+            return
+
+        for line, service, reference, first_line in duplicates:
+            if first_line is None:
+                message = f"L'opération {service} de référence {reference} existe déjà"
+            else:
+                message = f"L'opération {service} de référence {reference} est en double dans le fichier (ligne {first_line})"
+            file_data['errors'].append({'row': line, 'message': message, 'is_duplicate': True})
+
+        file_data['rows_success'] += len(converted) - len(duplicates)
+        file_data['rows_failed'] += len(duplicates)
+
+        duplicate_lines = {duplicate[0] for duplicate in duplicates}
+        for index, service, reference in zip(converted.index, converted['service'], converted['reference']):
+            if index + 2 not in duplicate_lines:
+                self.remember_key(service, reference, file_data['filename'], index + 2)
+
+    def load_existing_keys(self, conn, converted):
+        """Charge dans l'index les clés en base des jours présents dans une tranche
+
+        Seuls les jours de la tranche pas encore chargés sont lus, par
+        intervalles de jours consécutifs : une date isolée ne fait pas lire
+        toute la période qui la sépare des autres. Les jours sont réservés
+        sous keys_lock mais lus hors du verrou, sans bloquer les autres
+        workers. Une clé absente de l'index n'est pas pour autant nouvelle
+        (jour en cours de chargement par un autre worker, opération en base
+        avec une autre date) : elle reste vérifiée par la base.
+        """
+        days = pd.DatetimeIndex(converted['date_transaction'].dropna().dt.normalize().unique())
+        with self.keys_lock:
+            missing = sorted(day for day in (day.to_pydatetime() for day in days) if day not in self.loaded_days)
+            self.loaded_days.update(missing)
+        if not missing:
+            return
+
+        ranges = []
+        for day in missing:
+            if ranges and ranges[-1][1] == day:
+                ranges[-1][1] = day + timedelta(days=1)
+            else:
+                ranges.append([day, day + timedelta(days=1)])
+
+        keys = set()
+        try:
+            for low, high in ranges:
+                # Curseur serveur : les clés sont lues par paquets, sans copie intégrale du résultat
+                with conn.cursor(name='existing_keys') as keys_cur:
+                    keys_cur.itersize = 50000
+                    keys_cur.execute("""
+                        SELECT service || chr(31) || reference
+                        FROM transactions
+                        WHERE date_transaction >= %s AND date_transaction < %s
+                          AND service IS NOT NULL AND reference IS NOT NULL
+                    """, (low, high))
+                    keys.update(key for key, in keys_cur)
+        except Exception:
+            with self.keys_lock:
+                self.loaded_days.difference_update(missing)
+            raise
+        with self.keys_lock:
+            self.existing_keys |= keys
+
+    def known_duplicate(self, service, reference, filename):
+        """Message de doublon si la clé est déjà connue de l'index, sinon None"""
+        if service is None or reference is None:
+            return None
+        key = service + KEY_SEPARATOR + reference
+        if key in self.existing_keys:
+            return f"L'opération {service} de référence {reference} existe déjà"
+        first_line = self.file_keys[filename].get(key)
+        if first_line is not None:
+            return f"L'opération {service} de référence {reference} est en double dans le fichier (ligne {first_line})"
         return None
 
+    def remember_key(self, service, reference, filename, line):
+        """Ajoute aux clés du fichier en cours celle d'une ligne importée"""
+        if service is not None and reference is not None:
+            self.file_keys[filename].setdefault(service + KEY_SEPARATOR + reference, line)
+
+    def skip_known_duplicates(self, converted, file_data):
+        """Écarte, sans interroger la base, les lignes dont la clé est connue de l'index
+
+        Les doublons écartés sont comptés et signalés comme ceux détectés par
+        la base. Retourne les lignes restantes à importer.
+        """
+        keep = []
+        for index, service, reference in zip(converted.index, converted['service'], converted['reference']):
+            message = self.known_duplicate(service, reference, file_data['filename'])
+            keep.append(message is None)
+            if message is not None:
+                file_data['rows_failed'] += 1
+                file_data['errors'].append({'row': index + 2, 'message': message, 'is_duplicate': True})
+        return converted[keep]
+
+    @staticmethod
+    def convert_columns(df):
+        """Convertit les colonnes du CSV vers celles de transactions, une colonne à la fois
+
+        Retourne un DataFrame indexé comme df : texte (None si vide), float
+        (NaN si invalide) ou datetime64 (NaT si aucun format ne correspond).
+        Une colonne absente du CSV est entièrement vide.
+        """
+        converted = {}
+        for header, column, kind in COLUMN_MAPPING:
+            source = df[header] if header in df.columns else pd.Series(index=df.index, dtype=str)
+            converted[column] = CONVERTERS[kind](source)
+        return pd.DataFrame(converted, index=df.index)
+
+    @staticmethod
+    def row_values(converted):
+        """Valeurs Python de chaque ligne convertie, avec None pour les valeurs manquantes"""
+        columns = [converted[column].astype(object).where(converted[column].notna(), None).tolist()
+                   for column in TRANSACTION_COLUMNS]
+        return zip(*columns)
+
     def generate_report(self):
         """Génère un rapport détaillé de l'importation"""
         folder_path = Path.home() / 'documents' / 'etats_bruts'
@@ -306,7 +643,11 @@ class TransactionImporter:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Import de transactions avec mode test optionnel')
     parser.add_argument('--test', action='store_true', help='Exécuter en mode test sans faire d\'insertions')
+    parser.add_argument('--bulk', action='store_true', help='Importer chaque fichier en bloc (COPY puis un seul INSERT ... ON CONFLICT)')
+    parser.add_argument('--workers', type=int, default=1, help='Nombre de fichiers lus et importés en parallèle (une connexion par worker)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f'Lignes lues et importées à la fois (défaut: {CHUNK_ROWS})')
     args = parser.parse_args()
 
-    importer = TransactionImporter(test_mode=args.test)
+    importer = TransactionImporter(test_mode=args.test, bulk=args.bulk, workers=args.workers,
+                                   chunk_rows=args.chunk_rows)
     importer.import_transactions()
\ No newline at end of file
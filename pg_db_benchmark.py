@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Banc d'essai de pg_db_extractor.py : remplit une base jetable avec un schéma
+# synthétique puis mesure chaque mode d'export
+
+# Configuration du serveur de test - Modifie ces valeurs selon ta configuration
+DB_HOST = None             # None = cluster temporaire (pgserver), supprimé après les mesures
+DB_PORT = 5432             # Port d'un serveur existant (--host)
+DB_USER = 'postgres'       # Nom d'utilisateur (doit pouvoir créer une base)
+DB_PASSWORD = ''           # Mot de passe d'un serveur existant (défaut: variable PGPASSWORD)
+BENCH_PREFIX = 'db_bench_' # Préfixe obligatoire de la base jetable sur un serveur existant
+BENCH_DB = 'db_bench_extracteur'  # Base jetable, supprimée et recréée à chaque lancement
+SCALE = 1                  # Facteur d'échelle des volumes (1 = ~130 000 lignes, ~25 Mo)
+REPORT_FILE = None         # None = benchmark_<commit>_<date>.json dans le répertoire courant
+
+import psycopg2
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import argparse
+from datetime import datetime
+
+try:
+    import pgserver
+except ImportError:
+    pgserver = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+EXTRACTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pg_db_extractor.py')
+
+# Modes d'export mesurés : nom, options de pg_db_extractor.py, module requis
+BENCH_MODES = [
+    ('sql-insert', ['--format', 'sql', '--data-format', 'insert'], None),
+    ('sql-copy', ['--format', 'sql', '--data-format', 'copy'], None),
+    ('sql-copy-gzip', ['--format', 'sql', '--data-format', 'copy', '--compress', 'gzip'], None),
+    ('sql-insert-jobs4', ['--format', 'sql', '--data-format', 'insert', '--jobs', '4'], None),
+    ('directory-jobs4', ['--format', 'directory', '--jobs', '4'], None),
+    ('directory-zstd', ['--format', 'directory', '--compress', 'zstd'], 'zstandard'),
+    ('parquet', ['--format', 'parquet'], 'pyarrow'),
+]
+OPTIONAL_MODULES = {'zstandard': zstandard, 'pyarrow': pyarrow}
+
+# Schéma synthétique : enum, séquences, clés étrangères, vue, trigger,
+# une table large et une table chargée en bytea
+SCHEMA_SQL = """
+CREATE TYPE bench_statut AS ENUM ('nouveau', 'actif', 'suspendu', 'clos');
+CREATE SEQUENCE bench_facture_seq START 1000;
+
+CREATE TABLE bench_pays (
+    id integer PRIMARY KEY,
+    code char(2) NOT NULL,
+    nom text NOT NULL
+);
+
+CREATE TABLE bench_client (
+    id serial PRIMARY KEY,
+    pays_id integer REFERENCES bench_pays(id),
+    nom text NOT NULL,
+    email varchar(120),
+    statut bench_statut NOT NULL DEFAULT 'nouveau',
+    solde numeric(12,2),
+    cree_le timestamptz NOT NULL,
+    tags text[],
+    meta jsonb
+);
+
+CREATE TABLE bench_commande (
+    id bigserial PRIMARY KEY,
+    client_id integer NOT NULL REFERENCES bench_client(id),
+    facture integer DEFAULT nextval('bench_facture_seq'),
+    montant double precision,
+    date_commande timestamp NOT NULL,
+    statut bench_statut NOT NULL,
+    note text,
+    maj_le timestamptz
+);
+
+CREATE TABLE bench_document (
+    id serial PRIMARY KEY,
+    commande_id bigint REFERENCES bench_commande(id),
+    nom text,
+    contenu bytea
+);
+
+CREATE FUNCTION bench_maj_le() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.maj_le := now();
+    RETURN NEW;
+END;
+$$;
+CREATE TRIGGER bench_commande_maj BEFORE UPDATE ON bench_commande
+    FOR EACH ROW EXECUTE FUNCTION bench_maj_le();
+
+CREATE INDEX bench_commande_date_idx ON bench_commande (date_commande);
+
+CREATE VIEW bench_v_client_total AS
+SELECT c.id, c.nom, count(o.id) AS commandes, sum(o.montant) AS total
+FROM bench_client c LEFT JOIN bench_commande o ON o.client_id = c.id
+GROUP BY c.id, c.nom;
+"""
+
+# Nombre de colonnes de chaque type de la table large
+WIDE_COLUMNS = 10
+
+
+def wide_table_sql():
+    """Définition et remplissage de la table large (entiers, flottants, textes, dates)"""
+    # % doublé : la requête d'insertion est paramétrée
+    kinds = [('i', 'integer', "(g * {n}) %% 100000"),
+             ('f', 'double precision', "random() * {n}"),
+             ('t', 'text', "md5((g + {n})::text)"),
+             ('d', 'date', "DATE '2020-01-01' + ((g + {n}) %% 2000)")]
+    columns = []
+    values = []
+    for prefix, data_type, expression in kinds:
+        for n in range(1, WIDE_COLUMNS + 1):
+            columns.append(f"{prefix}{n:02d} {data_type}")
+            values.append(expression.format(n=n))
+    create = f"CREATE TABLE bench_large (id integer PRIMARY KEY, {', '.join(columns)});"
+    insert = f"INSERT INTO bench_large SELECT g, {', '.join(values)} FROM generate_series(1, %(large)s) g;"
+    return create, insert
+
+
+# Volumes pour un facteur d'échelle de 1
+BASE_VOLUMES = {'client': 10000, 'commande': 100000, 'large': 20000, 'document': 2000}
+
+DATA_SQL = """
+INSERT INTO bench_pays SELECT g, chr(65 + g %% 26) || chr(65 + g / 26 %% 26), 'Pays ' || g FROM generate_series(1, 200) g;
+
+INSERT INTO bench_client (pays_id, nom, email, statut, solde, cree_le, tags, meta)
+SELECT 1 + g %% 200, 'Client ' || g || E' l''ami\\t' || md5(g::text), 'client' || g || '@exemple.fr',
+       (ARRAY['nouveau', 'actif', 'suspendu', 'clos']::bench_statut[])[1 + g %% 4],
+       round((random() * 10000)::numeric, 2), now() - g * interval '1 minute',
+       ARRAY['tag' || g %% 7, 'tag' || g %% 11], jsonb_build_object('rang', g, 'vip', g %% 10 = 0)
+FROM generate_series(1, %(client)s) g;
+
+INSERT INTO bench_commande (client_id, montant, date_commande, statut, note)
+SELECT 1 + g %% %(client)s, random() * 1000, TIMESTAMP '2020-01-01' + g * interval '13 minutes',
+       (ARRAY['nouveau', 'actif', 'suspendu', 'clos']::bench_statut[])[1 + g %% 4],
+       CASE WHEN g %% 3 = 0 THEN NULL ELSE 'Commande n°' || g END
+FROM generate_series(1, %(commande)s) g;
+
+-- Environ 4 ko de données aléatoires (peu compressibles) par document
+INSERT INTO bench_document (commande_id, nom, contenu)
+SELECT 1 + g %% %(commande)s, 'document_' || g || '.bin',
+       (SELECT decode(string_agg(md5(random()::text || g || i), ''), 'hex') FROM generate_series(1, 256) i)
+FROM generate_series(1, %(document)s) g;
+"""
+
+
+class ExtractorBenchmark:
+    def __init__(self, host, port, user, password, database=BENCH_DB, scale=SCALE):
+        """Initialise le banc d'essai sur une base jetable"""
+        self.connection_params = {
+            'host': host,
+            'port': port,
+            'user': user,
+            'password': password
+        }
+        self.database = database
+        self.scale = scale
+
+    def create_database(self):
+        """Supprime puis recrée la base de test et y charge le schéma synthétique"""
+        admin = psycopg2.connect(**self.connection_params, database='postgres')
+        admin.autocommit = True
+        try:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP DATABASE IF EXISTS {self.database}")
+                cur.execute(f"CREATE DATABASE {self.database}")
+        finally:
+            admin.close()
+
+        volumes = {name: int(count * self.scale) for name, count in BASE_VOLUMES.items()}
+        create_wide, insert_wide = wide_table_sql()
+        start = time.perf_counter()
+        conn = psycopg2.connect(**self.connection_params, database=self.database)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SCHEMA_SQL)
+                cur.execute(create_wide)
+                cur.execute(DATA_SQL, volumes)
+                cur.execute(insert_wide, volumes)
+            conn.commit()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("VACUUM ANALYZE")
+                cur.execute("""
+                    SELECT relname, n_live_tup, pg_total_relation_size(relid)
+                    FROM pg_stat_user_tables ORDER BY relname
+                """)
+                tables = {name: {'rows': rows, 'bytes': size} for name, rows, size in cur.fetchall()}
+        finally:
+            conn.close()
+        print(f"Base {self.database} générée en {time.perf_counter() - start:.1f} secondes "
+              f"({sum(t['rows'] for t in tables.values())} lignes)")
+        return tables
+
+    def drop_database(self):
+        admin = psycopg2.connect(**self.connection_params, database='postgres')
+        admin.autocommit = True
+        try:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP DATABASE IF EXISTS {self.database}")
+        finally:
+            admin.close()
+
+    @staticmethod
+    def run_measured(command, log_file, env=None):
+        """Lance une commande et mesure sa durée et son pic de mémoire résidente (octets)
+
+        Le pic est relevé par psutil s'il est installé, sinon par wait4
+        (Unix) ; il vaut None si aucun des deux n'est disponible.
+        """
+        start = time.perf_counter()
+        with open(log_file, 'w', encoding='utf-8') as log:
+            proc = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+            peak_rss = None
+            if psutil is not None:
+                process = psutil.Process(proc.pid)
+                peak_rss = 0
+                while proc.poll() is None:
+                    try:
+                        peak_rss = max(peak_rss, process.memory_info().rss)
+                    except psutil.Error:
+                        pass
+                    time.sleep(0.02)
+            elif hasattr(os, 'wait4'):
+                _, status, usage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+                peak_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+            else:
+                proc.wait()
+        return proc.returncode, time.perf_counter() - start, peak_rss
+
+    @staticmethod
+    def output_size(path):
+        """Taille sur disque d'un fichier ou d'un répertoire de sortie"""
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        total = 0
+        for root, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files if name != 'report.json')
+        return total
+
+    def run_mode(self, name, options, work_dir):
+        """Exécute un export avec pg_db_extractor.py et rassemble ses mesures"""
+        output = os.path.join(work_dir, name)
+        if options[options.index('--format') + 1] == 'sql':
+            output += '.sql'
+            if '--compress' in options:
+                # Extension ajoutée par l'extracteur au script compressé
+                output += {'gzip': '.gz', 'zstd': '.zst'}[options[options.index('--compress') + 1].split(':')[0]]
+        command = [sys.executable, EXTRACTOR,
+                   '--host', str(self.connection_params['host']),
+                   '--port', str(self.connection_params['port']),
+                   '--user', self.connection_params['user'],
+                   '--database', self.database,
+                   '--output', output,
+                   '--no-progress'] + options
+        log_file = os.path.join(work_dir, name + '.log')
+        # Mot de passe par l'environnement : la ligne de commande est visible dans ps
+        returncode, seconds, peak_rss = self.run_measured(
+            command, log_file, env={**os.environ, 'PGPASSWORD': self.connection_params['password']})
+
+        report_file = os.path.join(output, 'report.json') if os.path.isdir(output) else output + '.report.json'
+        report = {}
+        if os.path.exists(report_file):
+            with open(report_file, 'r', encoding='utf-8') as rf:
+                report = json.load(rf)
+
+        totals = report.get('totals', {})
+        phases = report.get('phases', {})
+        result = {
+            'mode': name,
+            'options': options,
+            'returncode': returncode,
+            'seconds': round(seconds, 3),
+            'catalog_seconds': phases.get('catalog'),
+            'data_seconds': phases.get('data'),
+            'rows': totals.get('rows'),
+            'rows_per_second': totals.get('rows_per_second'),
+            'mb_per_second': totals.get('mb_per_second'),
+            'output_bytes': self.output_size(output) if os.path.exists(output) else None,
+            'peak_rss_mb': round(peak_rss / 1048576, 1) if peak_rss else None
+        }
+        if returncode != 0 or not report:
+            with open(log_file, 'r', encoding='utf-8', errors='replace') as log:
+                result['error'] = log.read()[-2000:]
+        return result
+
+    def run(self, modes, keep=False):
+        """Génère la base, mesure chaque mode et retourne le rapport"""
+        tables = self.create_database()
+        results = []
+        try:
+            with tempfile.TemporaryDirectory(prefix='pg_bench_') as work_dir:
+                for name, options, module in BENCH_MODES:
+                    if modes and name not in modes:
+                        continue
+                    if module and OPTIONAL_MODULES[module] is None:
+                        print(f"{name}: ignoré (module {module} absent)")
+                        continue
+                    result = self.run_mode(name, options, work_dir)
+                    results.append(result)
+                    if result.get('error'):
+                        print(f"{name}: échec (code {result['returncode']})")
+                    else:
+                        print(f"{name}: {result['seconds']:.2f} s, {result['rows_per_second'] or 0:,.0f} lignes/s, "
+                              f"{result['mb_per_second'] or 0:.1f} Mo/s, pic {result['peak_rss_mb']} Mo")
+        finally:
+            if not keep:
+                self.drop_database()
+
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'scale': self.scale,
+            'tables': tables,
+            'modes': results
+        }
+
+
+def start_temporary_server():
+    """Démarre un cluster PostgreSQL temporaire avec pgserver
+
+    Retourne le serveur, son répertoire de données et les paramètres de
+    connexion (socket Unix, ou port local sous Windows). Le banc d'essai
+    ne touche ainsi jamais un serveur existant.
+    """
+    pgdata = tempfile.mkdtemp(prefix='pg_bench_cluster_')
+    try:
+        server = pgserver.get_server(pgdata, cleanup_mode='delete')
+    except Exception:
+        shutil.rmtree(pgdata, ignore_errors=True)
+        raise
+    info = server.get_postmaster_info()
+    params = {
+        'host': str(info.socket_dir) if info.socket_dir else info.hostname,
+        'port': info.port,
+        'user': 'postgres',
+        'password': ''
+    }
+    return server, pgdata, params
+
+
+def git_commit():
+    """Commit courant du dépôt de l'extracteur, pour comparer les rapports entre commits"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(EXTRACTOR),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(previous, current):
+    """Affiche l'évolution de la durée de chaque mode par rapport à un rapport précédent"""
+    before = {result['mode']: result for result in previous.get('modes', [])}
+    print(f"Comparaison avec {previous.get('commit')} ({previous.get('generated_at')}, échelle {previous.get('scale')}):")
+    for result in current['modes']:
+        old = before.get(result['mode'])
+        if not old or not old.get('seconds') or result.get('error'):
+            continue
+        ratio = result['seconds'] / old['seconds']
+        print(f"  {result['mode']}: {old['seconds']:.2f} s -> {result['seconds']:.2f} s ({(ratio - 1) * 100:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mesure les performances de pg_db_extractor.py sur une base synthétique')
+    parser.add_argument('--host', default=DB_HOST,
+                        help='Hôte d\'un serveur PostgreSQL existant (défaut: cluster temporaire démarré avec pgserver)')
+    parser.add_argument('--port', type=int, default=DB_PORT, help=f'Port du serveur PostgreSQL (défaut: {DB_PORT})')
+    parser.add_argument('--user', default=DB_USER, help=f'Nom d\'utilisateur PostgreSQL (défaut: {DB_USER})')
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD', DB_PASSWORD),
+                        help='Mot de passe PostgreSQL (défaut: variable PGPASSWORD)')
+    parser.add_argument('--database', default=BENCH_DB,
+                        help=f'Base jetable à (re)créer, préfixée par {BENCH_PREFIX} (défaut: {BENCH_DB})')
+    parser.add_argument('--i-know', action='store_true',
+                        help='Autorise la suppression et la recréation de --database sur le serveur --host')
+    parser.add_argument('--scale', type=float, default=SCALE, help=f'Facteur d\'échelle des volumes (défaut: {SCALE})')
+    parser.add_argument('--mode', action='append', default=[], choices=[mode[0] for mode in BENCH_MODES],
+                        help='Mode à mesurer, répétable (défaut: tous)')
+    parser.add_argument('--output', default=REPORT_FILE, help='Rapport JSON (défaut: benchmark_<commit>_<date>.json)')
+    parser.add_argument('--compare', help='Rapport JSON précédent auquel comparer les durées')
+    parser.add_argument('--keep', action='store_true', help='Conserve la base de test après les mesures')
+
+    args = parser.parse_args()
+
+    # La base est supprimée puis recréée : jamais sur un serveur existant sans accord explicite
+    server = pgdata = None
+    if args.host is None:
+        if pgserver is None:
+            parser.error("pgserver n'est pas installé (pip install pgserver) : "
+                         f"indiquez un serveur de test avec --host, une base {BENCH_PREFIX}* et --i-know")
+        if args.keep:
+            parser.error("--keep n'a pas de sens avec le cluster temporaire, supprimé après les mesures")
+        server, pgdata, connection_params = start_temporary_server()
+        print(f"Cluster temporaire démarré ({connection_params['host']})")
+    else:
+        if not args.database.startswith(BENCH_PREFIX):
+            parser.error(f"sur un serveur existant, la base doit commencer par {BENCH_PREFIX}")
+        if not args.i_know:
+            parser.error(f"--i-know est requis pour supprimer et recréer {args.database} sur {args.host}")
+        connection_params = {'host': args.host, 'port': args.port, 'user': args.user, 'password': args.password}
+
+    try:
+        benchmark = ExtractorBenchmark(**connection_params, database=args.database, scale=args.scale)
+        report = benchmark.run(args.mode, keep=args.keep)
+    finally:
+        if server is not None:
+            server.cleanup()
+            shutil.rmtree(pgdata, ignore_errors=True)
+
+    output = args.output or f"benchmark_{report['commit'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Rapport du banc d'essai: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
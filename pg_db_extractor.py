@@ -11,15 +11,749 @@ DB_USER = 'postgres'       # Nom d'utilisateur
 DB_PASSWORD = 'trinita'   # Mot de passe
 DB_SCHEMA = 'public'       # Schéma à extraire
 OUTPUT_FILE = r"D:\code\080425\bakup_cera1.sql"         # None = nom_bdd_date.sql, ou spécifier un chemin
+ITERSIZE = 10000           # Lignes rapatriées par aller-retour du curseur serveur
+BATCH_SIZE = 1000          # Lignes par instruction INSERT
+BATCH_BYTES = 16 * 1024 * 1024  # Taille maximale d'une instruction INSERT (octets), bornant la mémoire d'un lot
+LARGE_VALUE_SIZE = 64 * 1024    # Valeurs bytea/text plus longues lues et écrites par tranches (octets)
+DATA_FORMAT = 'insert'     # 'insert' (INSERT INTO ... VALUES) ou 'copy' (COPY ... FROM stdin)
+JOBS = 1                   # Nombre de connexions qui exportent les tables en parallèle
+OUTPUT_FORMAT = 'sql'      # 'sql' (script unique), 'directory' (un fichier par table + manifeste) ou 'parquet'
+COMPRESSION = None         # None, 'gzip', 'zstd' ou 'gzip:9' / 'zstd:19' pour fixer le niveau
+CHUNK_SIZE = 1024 * 1024   # Taille des blocs transmis au thread de compression (octets)
+PARQUET_ROW_GROUP_SIZE = 100000  # Lignes par groupe de lignes Parquet (mémoire bornée par groupe)
+PROGRESS = True            # Affiche une ligne de progression pendant l'export
+CHUNK_ROWS = None          # Lignes par tranche de clé primaire (None = tables lues d'un seul tenant), dans une seule transaction
+SPLIT_SIZE = None          # Taille des parties du script SQL, ex. '500M' (None = un seul fichier)
+REUSE_FROM = None          # Sauvegarde répertoire précédente dont les tables inchangées sont reprises
+FINGERPRINT_HASH = False   # Ajoute à l'empreinte un hachage du contenu calculé par le serveur (activé par --reuse-from)
+MANIFEST_FILE = None       # Manifeste des watermarks du mode incrémental (None = à côté du fichier de sortie)
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.extensions
+import gzip
+import hashlib
+import io
+import json
+import math
 import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
 import argparse
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 6, 'zstd': 3}
+INTEGER_TYPES = {'smallint', 'integer', 'bigint'}
+
+# Paramètres de session : formats de sortie texte stables quel que soit le serveur
+SESSION_OPTIONS = '-c DateStyle=ISO -c IntervalStyle=postgres -c extra_float_digits=3'
+# Paramètres en tête de script dont dépendent les littéraux écrits
+SCRIPT_SETTINGS = ("SET client_encoding = 'UTF8';\n"
+                   "SET standard_conforming_strings = on;\n"
+                   "SET DateStyle = ISO;\n"
+                   "SET IntervalStyle = postgres;\n\n")
+
+
+def encode_text(val):
+    """Littéral SQL d'une chaîne (standard_conforming_strings activé)"""
+    return "'" + val.replace("'", "''") + "'"
+
+
+def encode_bool(val):
+    return "TRUE" if val else "FALSE"
+
+
+def encode_float(val):
+    # inf et nan doivent être écrits comme des chaînes
+    return repr(val) if math.isfinite(val) else f"'{val}'"
+
+
+def encode_numeric(val):
+    return str(val) if val.is_finite() else f"'{val}'"
+
+
+def encode_bytea(val):
+    # Format hexadécimal de PostgreSQL : '\x0aff...'
+    return "'\\x" + val.hex() + "'"
+
+
+# Encodeur par type PostgreSQL (pg_type.typname) pour les types lus nativement ;
+# les autres types sont convertis en texte par le serveur puis encodés comme du texte
+VALUE_ENCODERS = {
+    'int2': str, 'int4': str, 'int8': str, 'oid': str,
+    'float4': encode_float, 'float8': encode_float,
+    'numeric': encode_numeric,
+    'bool': encode_bool,
+    'bytea': encode_bytea,
+    'text': encode_text, 'varchar': encode_text, 'bpchar': encode_text, 'name': encode_text,
+}
+
+
+CONSTRAINT_TYPES = {'p': 'PRIMARY KEY', 'u': 'UNIQUE', 'f': 'FOREIGN KEY', 'c': 'CHECK'}
+FK_ACTIONS = {'a': 'NO ACTION', 'r': 'RESTRICT', 'c': 'CASCADE', 'n': 'SET NULL', 'd': 'SET DEFAULT'}
+
+# Requêtes de chargement du catalogue (une requête par famille d'objets)
+CATALOG_TYPES_QUERY = """
+SELECT
+    t.typname AS name,
+    t.typtype,
+    CASE
+        WHEN t.typtype = 'e' THEN (
+            SELECT string_agg(quote_literal(e.enumlabel), ', ' ORDER BY e.enumsortorder)
+            FROM pg_enum e
+            WHERE e.enumtypid = t.oid
+        )
+        ELSE NULL
+    END AS enum_values
+FROM pg_type t
+JOIN pg_namespace n ON n.oid = t.typnamespace
+LEFT JOIN pg_class c ON c.oid = t.typrelid
+WHERE n.nspname = %s
+  AND (t.typtype = 'e' OR (t.typtype = 'c' AND c.relkind = 'c'))
+ORDER BY t.typname;
+"""
+
+CATALOG_COLUMNS_QUERY = """
+SELECT
+    c.relname AS table_name,
+    a.attname AS column_name,
+    format_type(a.atttypid, a.atttypmod) AS data_type,
+    t.typname,
+    t.typcategory,
+    a.attnotnull AS not_null,
+    a.attstorage AS storage,
+    pg_get_expr(d.adbin, d.adrelid) AS column_default
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_type t ON t.oid = a.atttypid
+LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+ORDER BY c.relname, a.attnum;
+"""
+
+CATALOG_CONSTRAINTS_QUERY = """
+SELECT
+    con.conname AS constraint_name,
+    rel.relname AS table_name,
+    con.contype,
+    ARRAY(
+        SELECT a.attname
+        FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+    ) AS columns,
+    fns.nspname AS ref_schema,
+    frel.relname AS ref_table,
+    ARRAY(
+        SELECT a.attname
+        FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+        ORDER BY k.ord
+    ) AS ref_columns,
+    con.confupdtype,
+    con.confdeltype,
+    pg_get_constraintdef(con.oid) AS definition
+FROM pg_constraint con
+JOIN pg_class rel ON rel.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = rel.relnamespace
+LEFT JOIN pg_class frel ON frel.oid = con.confrelid
+LEFT JOIN pg_namespace fns ON fns.oid = frel.relnamespace
+WHERE n.nspname = %s AND con.contype IN ('p', 'u', 'f', 'c')
+ORDER BY
+    -- Les clés étrangères après toutes les clés primaires et uniques qu'elles référencent
+    CASE con.contype WHEN 'p' THEN 1 WHEN 'u' THEN 2 WHEN 'f' THEN 3 ELSE 4 END,
+    rel.relname,
+    con.conname;
+"""
+
+CATALOG_SEQUENCES_QUERY = """
+SELECT
+    s.relname AS sequence_name,
+    CASE WHEN t.relname IS NOT NULL THEN t.relname || '.' || a.attname END AS seq_details,
+    format_type(ps.data_type, NULL) AS data_type,
+    ps.start_value,
+    ps.min_value,
+    ps.max_value,
+    ps.increment_by,
+    ps.cycle,
+    ps.cache_size,
+    ps.last_value,
+    ps.last_value IS NOT NULL AS is_called
+FROM pg_class s
+JOIN pg_namespace n ON n.oid = s.relnamespace
+JOIN pg_sequences ps ON ps.schemaname = n.nspname AND ps.sequencename = s.relname
+LEFT JOIN pg_depend d
+    ON d.classid = 'pg_class'::regclass AND d.objid = s.oid
+    AND d.refclassid = 'pg_class'::regclass AND d.deptype IN ('a', 'i')
+LEFT JOIN pg_class t ON t.oid = d.refobjid
+LEFT JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+WHERE n.nspname = %s AND s.relkind = 'S'
+ORDER BY s.relname;
+"""
+
+CATALOG_FUNCTIONS_QUERY = """
+SELECT
+    p.proname AS function_name,
+    pg_get_functiondef(p.oid) AS function_def
+FROM pg_proc p
+JOIN pg_namespace n ON p.pronamespace = n.oid
+WHERE n.nspname = %s AND p.prokind IN ('f', 'p')
+ORDER BY p.proname;
+"""
+
+CATALOG_VIEWS_QUERY = """
+SELECT
+    c.relname AS view_name,
+    rtrim(pg_get_viewdef(c.oid, true), ';') AS view_definition
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %s AND c.relkind = 'v'
+ORDER BY c.relname;
+"""
+
+CATALOG_TRIGGERS_QUERY = """
+SELECT
+    tg.tgname AS trigger_name,
+    c.relname AS event_object_table,
+    pg_get_triggerdef(tg.oid, true) AS trigger_def
+FROM pg_trigger tg
+JOIN pg_class c ON c.oid = tg.tgrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %s AND NOT tg.tgisinternal
+ORDER BY c.relname, tg.tgname;
+"""
+
+CATALOG_INDEXES_QUERY = """
+SELECT
+    c.relname AS tablename,
+    ic.relname AS indexname,
+    pg_get_indexdef(i.indexrelid) AS indexdef
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %s
+  AND NOT EXISTS (
+      SELECT 1
+      FROM pg_constraint con
+      WHERE con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x')
+  )
+ORDER BY c.relname, ic.relname;
+"""
+
+# Empreinte de modification des tables : compteurs d'activité et fichier de
+# données, enregistrés à titre indicatif (non transactionnels, voir fingerprint_matches)
+TABLE_FINGERPRINTS_QUERY = """
+SELECT
+    c.relname AS table_name,
+    c.relfilenode,
+    s.n_tup_ins,
+    s.n_tup_upd,
+    s.n_tup_del,
+    s.n_live_tup
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p');
+"""
+
+
+# Types Arrow des colonnes exportées en Parquet, par type PostgreSQL
+PARQUET_TYPES = {
+    'int2': 'int16', 'int4': 'int32', 'int8': 'int64',
+    'float4': 'float32', 'float8': 'float64',
+    'bool': 'bool_', 'bytea': 'binary'
+}
+NUMERIC_TYPMOD_RE = re.compile(r'^numeric\((\d+),(\d+)\)$')
+
+
+def parquet_column(col):
+    """Retourne l'expression SELECT et le type Arrow d'une colonne exportée en Parquet
+
+    Dates, horodatages et heures sont lus sous forme d'entiers (jours ou
+    microsecondes depuis 1970) : ni conversion Python, ni erreur sur les
+    dates avant Jésus-Christ. Les valeurs infinies, que Parquet ne sait
+    pas représenter, deviennent NULL. Les numeric à précision fixe sont
+    des décimaux (NaN devient NULL), les autres types restent en texte.
+    """
+    name = col['name']
+    typname = col['typname']
+    if typname in PARQUET_TYPES:
+        return name, getattr(pyarrow, PARQUET_TYPES[typname])()
+    if typname == 'date':
+        return f"CASE WHEN isfinite({name}) THEN {name} - DATE '1970-01-01' END", pyarrow.date32()
+    if typname in ('timestamp', 'timestamptz'):
+        timezone = 'UTC' if typname == 'timestamptz' else None
+        return (f"CASE WHEN isfinite({name}) THEN (extract(epoch FROM {name}) * 1000000)::int8 END",
+                pyarrow.timestamp('us', tz=timezone))
+    if typname == 'time':
+        return f"(extract(epoch FROM {name}) * 1000000)::int8", pyarrow.time64('us')
+    match = NUMERIC_TYPMOD_RE.match(col['data_type'])
+    if typname == 'numeric' and match and int(match.group(1)) <= 38:
+        return name, pyarrow.decimal128(int(match.group(1)), int(match.group(2)))
+    return f"{name}::text", pyarrow.string()
+
+
+def parse_compression(spec):
+    """Décode une option de compression 'methode[:niveau]' en (methode, niveau)"""
+    if not spec:
+        return None, None
+    method, _, level = spec.partition(':')
+    if method not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Compression inconnue: {method} (attendu: gzip ou zstd)")
+    if method == 'zstd' and zstandard is None:
+        raise ValueError("Le module zstandard est requis pour la compression zstd (pip install zstandard)")
+    return method, int(level) if level else DEFAULT_COMPRESSION_LEVELS[method]
+
+
+class ChunkedOutputWriter(io.RawIOBase):
+    """Fichier binaire qui compresse le flux dans un thread dédié
+
+    Chaque bloc reçu est passé au thread de compression par une file bornée :
+    la compression se fait pendant que le thread principal lit les lignes
+    suivantes, et le script non compressé n'est jamais écrit sur le disque.
+    Sans compression, les blocs sont écrits directement. Dans les deux cas
+    bytes_written compte les octets reçus (avant compression) ; en ajout à
+    un fichier existant, il part de la taille de ce fichier. Avec checksum,
+    sha256 est l'empreinte des octets écrits sur le disque.
+    """
+
+    def __init__(self, path, method=None, level=None, append=False, checksum=False):
+        super().__init__()
+        self.name = path
+        self._file = open(path, 'ab' if append else 'wb')
+        self.bytes_written = self._file.tell()
+        self.sha256 = hashlib.sha256() if checksum else None
+        self._compressor = None
+        self._error = None
+        if method is None:
+            return
+        if method == 'gzip':
+            # wbits=31 : flux deflate avec en-tête gzip
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        self._queue = queue.Queue(maxsize=8)
+        self._thread = threading.Thread(target=self._compress_chunks, daemon=True)
+        self._thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if self._error:
+            raise self._error
+        self.bytes_written += len(b)
+        if self._compressor is None:
+            self._write_file(b)
+        else:
+            self._queue.put(bytes(b))
+        return len(b)
+
+    def _compress_chunks(self):
+        """Boucle du thread de compression"""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._error:
+                continue
+            try:
+                self._write_file(self._compressor.compress(chunk))
+            except Exception as e:
+                self._error = e
+
+    def _write_file(self, data):
+        if self.sha256 is not None:
+            self.sha256.update(data)
+        self._file.write(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._compressor is not None:
+                self._queue.put(None)
+                self._thread.join()
+                if self._error:
+                    raise self._error
+                self._write_file(self._compressor.flush())
+        finally:
+            self._file.close()
+            super().close()
+
+
+def open_output(path, compression=None, append=False, checksum=False):
+    """Ouvre un fichier de sortie texte, compressé à la volée si demandé"""
+    method, level = parse_compression(compression)
+    raw = ChunkedOutputWriter(path, method, level, append, checksum)
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=CHUNK_SIZE), encoding='utf-8')
+
+
+def output_position(f):
+    """Nombre d'octets (avant compression) écrits dans un fichier ouvert par open_output"""
+    if isinstance(f, SplitOutput):
+        return f.position()
+    f.flush()
+    return f.buffer.raw.bytes_written
+
+
+def parse_size(spec):
+    """Convertit une taille comme 500M, 2G ou 100k en octets"""
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    spec = spec.strip().lower().rstrip('o').rstrip('b')
+    if spec and spec[-1] in units:
+        return int(float(spec[:-1]) * units[spec[-1]])
+    return int(spec)
+
+
+class SplitOutput:
+    """Script SQL découpé en parties numérotées d'environ split_size octets
+
+    Le changement de partie n'a lieu qu'en fin d'instruction (voir
+    statement_boundary). Chaque partie est une transaction complète avec ses
+    paramètres de session : pré-données, données et post-données occupent
+    des parties distinctes, et les parties de données sont indépendantes
+    les unes des autres. Le fichier d'index <script>.index.json liste les
+    parties terminées dans l'ordre, avec leur phase, leur taille et leur
+    empreinte sha256 ; il est mis à jour à chaque partie fermée.
+    """
+
+    def __init__(self, path, compression=None, split_size=None):
+        self.name = path
+        self.compression = compression
+        self.split_size = split_size
+        self.index_file = path + '.index.json'
+        self.phase = 'pre-data'
+        self.parts = []
+        self.closed_bytes = 0
+        self._file = None
+        self._open_part()
+
+    def _part_path(self, number):
+        extension = ''
+        base = self.name
+        for ext in COMPRESSION_EXTENSIONS.values():
+            if base.endswith(ext):
+                base, extension = base[:-len(ext)], ext
+        base, sql_extension = os.path.splitext(base)
+        return f"{base}.part{number:03d}{sql_extension}{extension}"
+
+    def _open_part(self):
+        path = self._part_path(len(self.parts) + 1)
+        self._file = open_output(path, self.compression, checksum=True)
+        self._path = path
+        if self.parts:
+            self._file.write(f"-- Partie {len(self.parts) + 1} ({self.phase})\nBEGIN;\n\n{SCRIPT_SETTINGS}")
+
+    def _close_part(self, complete=False):
+        raw = self._file.buffer.raw
+        self._file.close()
+        self.closed_bytes += raw.bytes_written
+        self.parts.append({
+            'file': os.path.basename(self._path),
+            'phase': self.phase,
+            'bytes': os.path.getsize(self._path),
+            'sha256': raw.sha256.hexdigest()
+        })
+        PostgreSQLExtractor.save_manifest(self.index_file, {
+            'script': os.path.basename(self.name),
+            'complete': complete,
+            'parts': self.parts
+        })
+
+    def rotate(self, phase=None):
+        """Termine la partie en cours et en commence une nouvelle"""
+        self._file.write("COMMIT;\n")
+        self._close_part()
+        if phase:
+            self.phase = phase
+        self._open_part()
+
+    def boundary(self):
+        """Change de partie si la partie en cours a atteint la taille maximale"""
+        if output_position(self._file) >= self.split_size:
+            self.rotate()
+
+    def position(self):
+        return self.closed_bytes + output_position(self._file)
+
+    def part_file(self):
+        """Fichier texte de la partie en cours
+
+        copy_expert n'écrit du texte que dans un io.TextIOBase : le flux COPY
+        d'une tranche est recopié directement dans la partie, qui ne change
+        qu'entre deux instructions.
+        """
+        return self._file
+
+    def write(self, text):
+        return self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self, complete=True):
+        if self._file is not None and not self._file.closed:
+            self._close_part(complete)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Un script interrompu par une exception reste marqué incomplet
+        self.close(complete=exc_type is None)
+
+
+def statement_boundary(f):
+    """Signale une fin d'instruction : un script découpé peut y changer de partie"""
+    if isinstance(f, SplitOutput):
+        f.boundary()
+
+
+# Vérification d'une sauvegarde : empreinte des lignes au format COPY texte,
+# identique à celle calculée par le serveur dans table_content_hash
+COPY_ESCAPE_RE = re.compile(r'\\(x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)')
+COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+# Caractères qui imposent des guillemets autour d'un champ dans record_out
+RECORD_QUOTE_RE = re.compile(r'[",\\() \t\n\r\v\f]')
+
+
+def unescape_copy_field(match):
+    escape = match.group(1)
+    if escape[0] == 'x' and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    if escape[0] in '01234567':
+        return chr(int(escape, 8))
+    return COPY_ESCAPES.get(escape, escape)
+
+
+def record_field(value):
+    """Représentation d'un champ dans le texte d'une ligne (row::text)"""
+    if value is None:
+        return ''
+    if value == '' or RECORD_QUOTE_RE.search(value):
+        return '"' + value.replace('\\', '\\\\').replace('"', '""') + '"'
+    return value
+
+
+def copy_line_hash(line):
+    """Empreinte signée sur 64 bits de md5(row::text) pour une ligne au format COPY texte"""
+    fields = []
+    for field in line.split('\t'):
+        if field == '\\N':
+            fields.append(None)
+        elif '\\' in field:
+            fields.append(COPY_ESCAPE_RE.sub(unescape_copy_field, field))
+        else:
+            fields.append(field)
+    text = "(" + ",".join(record_field(value) for value in fields) + ")"
+    value = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:16], 16)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def open_input(path, compression=None):
+    """Ouvre en lecture texte un fichier écrit par open_output"""
+    method, _ = parse_compression(compression)
+    if method == 'gzip':
+        raw = gzip.open(path, 'rb')
+    elif method == 'zstd':
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    else:
+        raw = open(path, 'rb')
+    # Seul \n sépare les lignes COPY : \r est toujours échappé dans les données
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='\n')
+
+
+def hash_copy_file(path, compression=None):
+    """Nombre de lignes et somme des empreintes d'un fichier de données COPY"""
+    count = 0
+    total = 0
+    with open_input(path, compression) as data:
+        for line in data:
+            total += copy_line_hash(line.rstrip('\n'))
+            count += 1
+    return f"{count}:{total}"
+
+
+def strongly_connected_components(graph):
+    """Composantes fortement connexes d'un graphe table -> tables référencées (Tarjan itératif)
+
+    Chaque composante est une liste triée de tables ; une composante de
+    plusieurs tables est un cycle de clés étrangères. Les composantes sont
+    produites parents d'abord : une composante ne référence que des
+    composantes qui la précèdent.
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in sorted(graph):
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, parents = work[-1]
+            parent = next((p for p in parents if p in graph), None)
+            if parent is None:
+                work.pop()
+                if work:
+                    lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+            elif parent not in index:
+                index[parent] = lowlink[parent] = len(index)
+                stack.append(parent)
+                on_stack.add(parent)
+                work.append((parent, iter(sorted(graph[parent]))))
+            elif parent in on_stack:
+                lowlink[node] = min(lowlink[node], index[parent])
+    return components
+
+
+class DumpMetrics:
+    """Mesures de performance d'un export : durée des phases, statistiques par table
+
+    Les mesures des tables peuvent être enregistrées depuis plusieurs threads.
+    """
+
+    def __init__(self, progress=False, total_tables=0):
+        self.progress = progress
+        self.total_tables = total_tables
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.tables = {}
+        self.lock = threading.Lock()
+        self._last_progress = 0.0
+        self._line_open = False
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def start_table(self, table_name):
+        """Retourne les compteurs d'une table à remplir pendant son export"""
+        return {'rows': 0, 'bytes': 0, 'fetch': 0.0, 'encode': 0.0, 'write': 0.0, 'copy': 0.0,
+                'start': time.perf_counter()}
+
+    def update_table(self, table_name, stats):
+        """Affiche la progression d'une table en cours d'export (au plus une fois par seconde)"""
+        if not self.progress:
+            return
+        now = time.perf_counter()
+        if now - self._last_progress < 1.0:
+            return
+        self._last_progress = now
+        elapsed = now - stats['start']
+        rate = stats['rows'] / elapsed if elapsed > 0 else 0
+        with self.lock:
+            self._print_progress(f"{table_name}: {stats['rows']} lignes ({rate:,.0f} lignes/s)")
+
+    def finish_table(self, table_name, stats):
+        """Enregistre les mesures d'une table terminée"""
+        stats = dict(stats)
+        stats['seconds'] = time.perf_counter() - stats.pop('start')
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else None
+        with self.lock:
+            self.tables[table_name] = stats
+            if self.progress:
+                self._print_progress(
+                    f"{table_name}: {stats['rows']} lignes, {stats['bytes'] / 1048576:.1f} Mo "
+                    f"en {stats['seconds']:.1f} s")
+
+    def _print_progress(self, message):
+        done = len(self.tables)
+        self._line_open = done < self.total_tables
+        print(f"\r[{done}/{self.total_tables}] {message}".ljust(100), end='' if self._line_open else '\n', flush=True)
+
+    def skip_table(self, table_name, reason):
+        """Enregistre une table qui n'a pas pu être exportée, comptée en erreur"""
+        with self.lock:
+            self.tables[table_name] = {'rows': 0, 'bytes': 0, 'seconds': 0.0, 'error': reason}
+
+    def failed_tables(self):
+        """Retourne les tables dont l'export a échoué"""
+        with self.lock:
+            return [name for name, stats in self.tables.items() if 'error' in stats]
+
+    def end_progress(self):
+        """Termine la ligne de progression si elle est restée ouverte"""
+        if self._line_open:
+            print()
+            self._line_open = False
+
+    def report(self, **details):
+        """Retourne le rapport complet sous forme de dictionnaire sérialisable"""
+        total_seconds = time.perf_counter() - self.start
+        total_rows = sum(t['rows'] for t in self.tables.values())
+        total_bytes = sum(t['bytes'] for t in self.tables.values())
+        data_seconds = self.phases.get('data') or total_seconds
+        report = dict(details)
+        report.update({
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': round(total_seconds, 3),
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'totals': {
+                'tables': len(self.tables),
+                'rows': total_rows,
+                'data_bytes': total_bytes,
+                'rows_per_second': round(total_rows / data_seconds, 1) if data_seconds else None,
+                'mb_per_second': round(total_bytes / 1048576 / data_seconds, 3) if data_seconds else None
+            },
+            'tables': {
+                name: {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+                for name, stats in self.tables.items()
+            }
+        })
+        return report
+
+    def write_report(self, report_file, **details):
+        """Écrit le rapport JSON de l'export"""
+        report = self.report(**details)
+        with open(report_file, 'w', encoding='utf-8') as rf:
+            json.dump(report, rf, indent=2, ensure_ascii=False)
+        return report
+
 
 class PostgreSQLExtractor:
-    def __init__(self, host, port, database, user, password, schema='public'):
+    def __init__(self, host, port, database, user, password, schema='public', itersize=ITERSIZE,
+                 data_format=DATA_FORMAT, jobs=JOBS, compression=COMPRESSION, progress=PROGRESS,
+                 chunk_rows=CHUNK_ROWS, subset=None, fingerprint_hash=FINGERPRINT_HASH, split_size=SPLIT_SIZE,
+                 batch_bytes=BATCH_BYTES):
         """Initialise la connexion à la base de données"""
         self.connection_params = {
             'host': host,
@@ -29,13 +763,31 @@ class PostgreSQLExtractor:
             'password': password
         }
         self.schema = schema
+        self.itersize = itersize
+        self.data_format = data_format
+        self.jobs = max(1, jobs)
+        self.compression = compression
+        self.progress = progress
+        self.chunk_rows = chunk_rows
+        self.subset = subset or {}  # table racine -> condition WHERE d'un export partiel
+        self.fingerprint_hash = fingerprint_hash
+        self.split_size = parse_size(split_size) if isinstance(split_size, str) else split_size
+        self.batch_bytes = parse_size(batch_bytes) if isinstance(batch_bytes, str) else batch_bytes
+        self.metrics = DumpMetrics()
+        self.snapshot_id = None
+        self.table_filters = {}   # table -> condition WHERE appliquée à la lecture
+        self.upsert_keys = {}     # table -> colonnes de conflit pour un export en upsert
+        self.catalog = None       # Modèle en mémoire du schéma (voir load_catalog)
+        self.checkpoint = None    # Point de reprise de l'export en cours (voir save_checkpoint)
         self.conn = None
         self.cursor = None
 
     def connect(self):
         """Établit la connexion à la base de données"""
         try:
-            self.conn = psycopg2.connect(**self.connection_params)
+            self.conn = psycopg2.connect(**self.connection_params, options=SESSION_OPTIONS)
+            # REPEATABLE READ : toutes les tables sont lues depuis le même instantané
+            self.conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ)
             self.cursor = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             print(f"Connecté à la base de données {self.connection_params['database']}")
         except Exception as e:
@@ -50,8 +802,39 @@ class PostgreSQLExtractor:
             self.conn.close()
             print("Connexion fermée")
 
+    def export_snapshot(self):
+        """Exporte l'instantané de la transaction courante pour d'autres connexions"""
+        self.cursor.execute("SELECT pg_export_snapshot()")
+        self.snapshot_id = self.cursor.fetchone()[0]
+        return self.snapshot_id
+
+    def attach_snapshot(self, snapshot_id):
+        """Place la transaction courante sur un instantané exporté"""
+        self.snapshot_id = snapshot_id
+        self.cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+
+    def create_worker(self):
+        """Ouvre une connexion supplémentaire qui lit le même instantané"""
+        worker = PostgreSQLExtractor(
+            **self.connection_params,
+            schema=self.schema,
+            itersize=self.itersize,
+            data_format=self.data_format,
+            chunk_rows=self.chunk_rows,
+            fingerprint_hash=self.fingerprint_hash,
+            batch_bytes=self.batch_bytes
+        )
+        worker.catalog = self.catalog
+        worker.metrics = self.metrics
+        worker.table_filters = self.table_filters
+        worker.upsert_keys = self.upsert_keys
+        worker.connect()
+        worker.attach_snapshot(self.snapshot_id)
+        return worker
+
     def get_schema_objects(self):
         """Retourne tous les objets du schéma dans l'ordre de dépendance"""
+        self.load_catalog()
         objects = {
             'types': self.get_types(),
             'sequences': self.get_sequences(),
@@ -64,498 +847,1597 @@ class PostgreSQLExtractor:
         }
         return objects
 
-    def get_types(self):
-        """Retourne tous les types personnalisés"""
-        query = """
-        SELECT 
-            pg_type.typname AS name,
-            pg_type.typtype,
-            CASE 
-                WHEN pg_type.typtype = 'e' THEN
-                    array_to_string(ARRAY(
-                        SELECT enumlabel 
-                        FROM pg_enum 
-                        WHERE pg_enum.enumtypid = pg_type.oid
-                        ORDER BY pg_enum.enumsortorder
-                    ), ', ')
-                ELSE NULL
-            END AS enum_values
-        FROM pg_type
-        LEFT JOIN pg_catalog.pg_namespace n ON n.oid = pg_type.typnamespace
-        WHERE (
-            pg_type.typtype = 'e' OR  -- enum
-            pg_type.typtype = 'c'     -- composite
-        )
-        AND n.nspname = %s
-        ORDER BY pg_type.typname;
+    def load_catalog(self):
+        """Charge tout le catalogue du schéma en mémoire
+
+        Quelques requêtes sur pg_catalog remplacent les vues information_schema
+        interrogées table par table : tables, colonnes, contraintes, séquences,
+        dépendances et objets annexes sont ensuite lus depuis ce modèle.
         """
+        start = time.perf_counter()
         try:
-            self.cursor.execute(query, (self.schema,))
-            return self.cursor.fetchall()
+            # search_path vide : types, défauts et définitions sont qualifiés par leur schéma
+            self.cursor.execute("SET search_path = ''")
+            catalog = {
+                'types': self._fetch_dicts(CATALOG_TYPES_QUERY, (self.schema,)),
+                'functions': self._fetch_dicts(CATALOG_FUNCTIONS_QUERY, (self.schema,)),
+                'views': self._fetch_dicts(CATALOG_VIEWS_QUERY, (self.schema,)),
+                'triggers': self._fetch_dicts(CATALOG_TRIGGERS_QUERY, (self.schema,)),
+                'indexes': self._fetch_dicts(CATALOG_INDEXES_QUERY, (self.schema,)),
+                'sequences': self._fetch_dicts(CATALOG_SEQUENCES_QUERY, (self.schema,)),
+                'tables': {}
+            }
+
+            # Tables et colonnes en une seule requête
+            for row in self._fetch_dicts(CATALOG_COLUMNS_QUERY, (self.schema,)):
+                table = catalog['tables'].setdefault(row['table_name'], {
+                    'name': row['table_name'],
+                    'columns': [],
+                    'primary_key': []
+                })
+                if row['column_name'] is not None:
+                    table['columns'].append({
+                        'name': row['column_name'],
+                        'data_type': row['data_type'],
+                        'typname': row['typname'],
+                        'typcategory': row['typcategory'],
+                        'not_null': row['not_null'],
+                        'storage': row['storage'],
+                        'default': row['column_default']
+                    })
+
+            # Contraintes, clés primaires et graphe des clés étrangères
+            catalog['constraints'] = []
+            catalog['dependencies'] = {}
+            for row in self._fetch_dicts(CATALOG_CONSTRAINTS_QUERY, (self.schema,)):
+                constraint_type = CONSTRAINT_TYPES[row['contype']]
+                columns = ", ".join(row['columns'])
+                constraint = {
+                    'constraint_name': row['constraint_name'],
+                    'table_name': row['table_name'],
+                    'constraint_type': constraint_type,
+                    'pk_columns': columns if constraint_type in ('PRIMARY KEY', 'UNIQUE') else None,
+                    'fk_columns': columns if constraint_type == 'FOREIGN KEY' else None,
+                    'ref_schema': row['ref_schema'],
+                    'ref_table': row['ref_table'],
+                    'ref_columns': ", ".join(row['ref_columns']) if row['ref_columns'] else None,
+                    'update_rule': FK_ACTIONS.get(row['confupdtype']),
+                    'delete_rule': FK_ACTIONS.get(row['confdeltype']),
+                    'definition': row['definition']
+                }
+                catalog['constraints'].append(constraint)
+
+                table = catalog['tables'].get(row['table_name'])
+                if constraint_type == 'PRIMARY KEY' and table:
+                    table['primary_key'] = list(row['columns'])
+                elif (constraint_type == 'FOREIGN KEY' and row['ref_schema'] == self.schema
+                      and row['ref_table'] != row['table_name']):
+                    references = catalog['dependencies'].setdefault(row['table_name'], [])
+                    if row['ref_table'] not in references:
+                        references.append(row['ref_table'])
+
+            # Retour au search_path de la session : les conditions de --subset et
+            # la lecture des données s'exécutent comme sur les connexions des jobs
+            self.cursor.execute("RESET search_path")
+            self.catalog = catalog
+            self.metrics.add_phase('catalog', time.perf_counter() - start)
+            return catalog
         except Exception as e:
-            print(f"Erreur lors de la récupération des types: {e}")
-            return []
+            print(f"Erreur lors du chargement du catalogue: {e}")
+            raise
+
+    def _fetch_dicts(self, query, params):
+        """Exécute une requête et retourne les lignes sous forme de dictionnaires"""
+        self.cursor.execute(query, params)
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def get_catalog(self):
+        """Retourne le catalogue du schéma, chargé au premier appel"""
+        if self.catalog is None:
+            self.load_catalog()
+        return self.catalog
+
+    def get_types(self):
+        """Retourne tous les types personnalisés"""
+        return self.get_catalog()['types']
 
     def get_sequences(self):
         """Retourne toutes les séquences"""
-        query = """
-        SELECT
-            s.relname as sequence_name,
-            pg_get_serial_sequence(t.tablename, c.column_name) as seq_details
-        FROM
-            information_schema.columns c
-        JOIN
-            pg_class s ON s.relkind = 'S' AND s.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = %s)
-        JOIN
-            (SELECT table_name AS tablename, table_schema FROM information_schema.tables WHERE table_schema = %s) t
-            ON c.table_name = t.tablename AND c.table_schema = t.table_schema
-        WHERE
-            c.column_default LIKE 'nextval%%'
-        ORDER BY
-            t.tablename, c.ordinal_position;
-        """
-        try:
-            self.cursor.execute(query, (self.schema, self.schema))
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Erreur lors de la récupération des séquences: {e}")
-            return []
+        return self.get_catalog()['sequences']
 
     def get_tables(self):
         """Retourne toutes les tables avec leurs définitions"""
-        # D'abord, récupérer les définitions de toutes les tables
-        query = """
-        SELECT 
-            table_name,
-            ARRAY(
-                SELECT column_name || ' ' || data_type || 
-                    CASE 
-                        WHEN character_maximum_length IS NOT NULL THEN '(' || character_maximum_length || ')'
-                        WHEN data_type = 'numeric' AND numeric_precision IS NOT NULL AND numeric_scale IS NOT NULL 
-                            THEN '(' || numeric_precision || ',' || numeric_scale || ')'
-                        ELSE ''
-                    END ||
-                    CASE WHEN is_nullable = 'NO' THEN ' NOT NULL' ELSE '' END ||
-                    CASE WHEN column_default IS NOT NULL THEN ' DEFAULT ' || column_default ELSE '' END
-                FROM information_schema.columns
-                WHERE table_schema = %s AND table_name = information_schema.tables.table_name
-                ORDER BY ordinal_position
-            ) as columns
-        FROM information_schema.tables
-        WHERE table_schema = %s AND table_type = 'BASE TABLE'
-        ORDER BY table_name;
+        tables = self.get_catalog()['tables']
+
+        # Tables dans l'ordre des niveaux de dépendance
+        sorted_tables = [table for level in self.get_table_levels() for table in level]
+
+        sorted_result = []
+        for table_name in sorted_tables:
+            columns = []
+            for col in tables[table_name]['columns']:
+                definition = f"{col['name']} {col['data_type']}"
+                if col['not_null']:
+                    definition += " NOT NULL"
+                if col['default'] is not None:
+                    definition += f" DEFAULT {col['default']}"
+                columns.append(definition)
+            sorted_result.append({'table_name': table_name, 'columns': columns})
+
+        return sorted_result
+
+    def get_functions(self):
+        """Retourne toutes les fonctions"""
+        return self.get_catalog()['functions']
+
+    def get_views(self):
+        """Retourne toutes les vues avec leurs définitions"""
+        return self.get_catalog()['views']
+
+    def get_triggers(self):
+        """Retourne tous les triggers"""
+        return self.get_catalog()['triggers']
+
+    def get_indexes(self):
+        """Retourne tous les index (excluant ceux des PK et contraintes uniques)"""
+        return self.get_catalog()['indexes']
+
+    def get_table_dependencies(self):
+        """Obtient un graphe de dépendances entre les tables basé sur les clés étrangères"""
+        return self.get_catalog()['dependencies']
+
+    def get_table_levels(self):
+        """Regroupe les tables par niveau de dépendance (tri de Kahn itératif)
+
+        Le niveau 0 contient les tables qui ne référencent aucune autre table,
+        le niveau n les tables dont tous les parents sont dans les niveaux
+        précédents : les tables d'un même niveau peuvent être exportées et
+        chargées simultanément. Un cycle de clés étrangères est rompu en
+        différant les clés étrangères d'une de ses tables vers les autres
+        tables du cycle (voir get_deferred_foreign_keys) ; elles sont de toute
+        façon créées après le chargement des données. Les tables qui ne font
+        que référencer un cycle gardent toutes leurs clés étrangères.
         """
+        catalog = self.get_catalog()
+        if 'levels' in catalog:
+            return catalog['levels']
 
-        try:
-            self.cursor.execute(query, (self.schema, self.schema))
-            tables = self.cursor.fetchall()
+        graph = self.get_table_dependencies()
+        remaining = {table: set(graph.get(table, [])) & set(catalog['tables']) for table in catalog['tables']}
+        levels = []
+        deferred = []
+        while remaining:
+            ready = [table for table, parents in remaining.items() if not parents]
+            if not ready:
+                # Aucune table prête : la première composante bloquée ne dépend que
+                # d'elle-même, c'est un cycle. Différer les références internes au
+                # cycle de la table qui en a le moins.
+                cycle = set(strongly_connected_components(remaining)[0])
+                table = min(cycle, key=lambda t: (len(remaining[t] & cycle), t))
+                cycle_keys = [c for c in catalog['constraints']
+                              if c['constraint_type'] == 'FOREIGN KEY' and c['table_name'] == table
+                              and c['ref_schema'] == self.schema and c['ref_table'] in cycle
+                              and c['ref_table'] != table]
+                print(f"Attention: cycle de clés étrangères rompu en différant "
+                      f"{', '.join(c['constraint_name'] for c in cycle_keys)} ({table})")
+                deferred += cycle_keys
+                remaining[table] -= cycle
+                continue
+            levels.append(ready)
+            for table in ready:
+                del remaining[table]
+            for parents in remaining.values():
+                parents.difference_update(ready)
 
-            # Récupérer la liste de toutes les tables
-            all_table_names = [table['table_name'] for table in tables]
+        catalog['levels'] = levels
+        catalog['deferred_foreign_keys'] = deferred
+        return levels
 
-            # Récupérer les dépendances et trier les tables
-            dependencies = self.get_table_dependencies()
-            sorted_tables = self.topological_sort(dependencies, all_table_names)
+    def get_deferred_foreign_keys(self):
+        """Retourne les clés étrangères ignorées pour rompre les cycles de dépendance"""
+        self.get_table_levels()
+        return self.get_catalog()['deferred_foreign_keys']
 
-            # Réorganiser les tables selon l'ordre trié
-            sorted_result = []
-            for table_name in sorted_tables:
-                for table in tables:
-                    if table['table_name'] == table_name:
-                        sorted_result.append(table)
-                        break
+    def get_constraints(self):
+        """Retourne toutes les contraintes (PK, FK, etc.)"""
+        return self.get_catalog()['constraints']
 
-            return sorted_result
-        except Exception as e:
-            print(f"Erreur lors de la récupération des tables: {e}")
+    def get_table_columns(self, table_name):
+        """Retourne les noms des colonnes d'une table dans l'ordre de définition"""
+        table = self.get_catalog()['tables'].get(table_name)
+        if table is None:
             return []
+        return [col['name'] for col in table['columns']]
 
-    def get_functions(self):
-        """Retourne toutes les fonctions"""
-        query = """
-        SELECT 
-            p.proname AS function_name,
-            pg_get_functiondef(p.oid) AS function_def
-        FROM pg_proc p
-        JOIN pg_namespace n ON p.pronamespace = n.oid
-        WHERE n.nspname = %s
-        ORDER BY p.proname;
+    def get_primary_key(self, table_name):
+        """Retourne les colonnes de la clé primaire d'une table avec leur type"""
+        table = self.get_catalog()['tables'].get(table_name)
+        if table is None:
+            return []
+        types = {col['name']: col['data_type'] for col in table['columns']}
+        return [{'column_name': name, 'data_type': types[name]} for name in table['primary_key']]
+
+    def build_subset_filters(self, roots):
+        """Calcule les filtres d'un sous-ensemble référentiellement clos
+
+        roots associe à des tables racines une condition WHERE. En remontant
+        le graphe des clés étrangères des tables filles vers les parents,
+        chaque parent ne garde que les lignes référencées par les lignes
+        retenues de ses filles : (colonnes référencées) IN (SELECT colonnes
+        de la clé étrangère FROM fille WHERE filtre de la fille). Les clés
+        étrangères d'une table vers elle-même sont fermées par une requête
+        récursive, celles d'un cycle entre plusieurs tables aussi (voir
+        close_cycle). Les tables non atteintes n'exportent aucune ligne.
         """
-        try:
-            self.cursor.execute(query, (self.schema,))
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Erreur lors de la récupération des fonctions: {e}")
+        catalog = self.get_catalog()
+        unknown = [table for table in roots if table not in catalog['tables']]
+        if unknown:
+            raise ValueError(f"Tables racines inconnues dans le schéma {self.schema}: {', '.join(unknown)}")
+
+        # Clés étrangères internes au schéma, regroupées par table référencée
+        referenced_by = {}
+        for c in catalog['constraints']:
+            if (c['constraint_type'] == 'FOREIGN KEY' and c['ref_schema'] == self.schema
+                    and c['ref_table'] in catalog['tables'] and c['table_name'] in catalog['tables']):
+                referenced_by.setdefault(c['ref_table'], []).append(c)
+
+        graph = {table: set(catalog['dependencies'].get(table, [])) & set(catalog['tables'])
+                 for table in catalog['tables']}
+        filters = {}
+        # Composantes fortement connexes dans l'ordre inverse : les filles sont
+        # filtrées avant leurs parents, les tables d'un cycle ensemble
+        for component in reversed(strongly_connected_components(graph)):
+            members = set(component)
+            bases = {}
+            for table_name in component:
+                conditions = []
+                if table_name in roots:
+                    conditions.append(f"({roots[table_name]})")
+                for c in referenced_by.get(table_name, []):
+                    if c['table_name'] not in members and c['table_name'] in filters:
+                        conditions.append(
+                            f"({c['ref_columns']}) IN (SELECT {c['fk_columns']} FROM {self.schema}.{c['table_name']}"
+                            f" WHERE {filters[c['table_name']]})")
+                if conditions:
+                    bases[table_name] = " OR ".join(conditions)
+            if not bases:
+                continue
+            internal_keys = [c for table_name in component for c in referenced_by.get(table_name, [])
+                             if c['table_name'] in members]
+            if len(component) > 1:
+                filters.update(self.close_cycle(component, bases, internal_keys))
+                continue
+            condition = bases[component[0]]
+            for c in internal_keys:
+                condition = self.close_self_reference(component[0], c, condition)
+            filters[component[0]] = condition
+
+        for table_name in catalog['tables']:
+            filters.setdefault(table_name, 'false')
+        return filters
+
+    def close_cycle(self, component, bases, keys):
+        """Filtres des tables d'un cycle de clés étrangères, fermés par une requête récursive
+
+        Les lignes retenues sont identifiées par (tableoid, ctid), identiques
+        dans l'instantané partagé par toutes les connexions de l'export. À
+        partir des lignes de départ de chaque table (bases), la requête ajoute
+        les lignes parentes de chaque clé étrangère du cycle (keys) jusqu'à
+        ce qu'aucune ligne ne s'ajoute.
+        """
+        seeds = [f"SELECT '{table_name}'::text, tableoid, ctid FROM {self.schema}.{table_name} "
+                 f"WHERE {bases[table_name]}" for table_name in component if table_name in bases]
+        steps = []
+        for c in keys:
+            fk_columns = ", ".join(f"f.{col.strip()}" for col in c['fk_columns'].split(','))
+            ref_columns = ", ".join(f"p.{col.strip()}" for col in c['ref_columns'].split(','))
+            steps.append(
+                f"SELECT '{c['ref_table']}'::text, p.tableoid, p.ctid FROM {self.schema}.{c['table_name']} f "
+                f"JOIN {self.schema}.{c['ref_table']} p ON ({ref_columns}) = ({fk_columns}) "
+                f"WHERE r.tbl = '{c['table_name']}' AND f.tableoid = r.toid AND f.ctid = r.tid")
+        closure = (f"WITH RECURSIVE closure(tbl, toid, tid) AS ({' UNION '.join(seeds)} "
+                   f"UNION SELECT s.* FROM closure r CROSS JOIN LATERAL ({' UNION ALL '.join(steps)}) s) ")
+        return {table_name: f"(tableoid, ctid) IN ({closure}SELECT toid, tid FROM closure WHERE tbl = '{table_name}')"
+                for table_name in component}
+
+    def close_self_reference(self, table_name, constraint, condition):
+        """Étend un filtre aux lignes parentes d'une clé étrangère de la table vers elle-même"""
+        ref_columns = [col.strip() for col in constraint['ref_columns'].split(',')]
+        fk_columns = [col.strip() for col in constraint['fk_columns'].split(',')]
+        ref_names = [f"r{i}" for i in range(len(ref_columns))]
+        fk_names = [f"f{i}" for i in range(len(fk_columns))]
+        source = f"{self.schema}.{table_name}"
+        parent_columns = ", ".join(f"p.{col}" for col in ref_columns + fk_columns)
+        return (
+            f"({condition}) OR ({', '.join(ref_columns)}) IN ("
+            f"WITH RECURSIVE ancestors({', '.join(ref_names + fk_names)}) AS ("
+            f"SELECT {', '.join(ref_columns + fk_columns)} FROM {source} WHERE {condition} "
+            f"UNION SELECT {parent_columns} FROM {source} p JOIN ancestors a "
+            f"ON ({', '.join(f'p.{col}' for col in ref_columns)}) = ({', '.join(f'a.{name}' for name in fk_names)})) "
+            f"SELECT {', '.join(ref_names)} FROM ancestors)"
+        )
+
+    def build_select(self, table_name, columns, key_range=None):
+        """Construit la requête de lecture d'une table, filtrée si nécessaire
+
+        key_range (borne basse exclue, borne haute incluse) limite la lecture
+        à une tranche de la clé primaire, lue dans l'ordre de la clé.
+        """
+        query = f"SELECT {', '.join(columns)} FROM {self.schema}.{table_name}"
+        conditions = []
+        if table_name in self.table_filters:
+            conditions.append(f"({self.table_filters[table_name]})")
+        if key_range is not None:
+            conditions += self.key_conditions(table_name, *key_range)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if key_range is not None:
+            # Colonnes qualifiées : un nom seul désignerait la colonne du SELECT
+            # de même nom, convertie en texte (ordre 1, 10, 2... pour un entier)
+            key = self.get_catalog()['tables'][table_name]['primary_key']
+            query += f" ORDER BY {', '.join(f'{table_name}.{col}' for col in key)}"
+        return query
+
+    def key_conditions(self, table_name, lower=None, upper=None):
+        """Conditions SQL bornant la clé primaire : lower < clé <= upper
+
+        Les bornes sont les valeurs texte de la clé, converties dans le type
+        de chaque colonne par le serveur.
+        """
+        key = self.get_primary_key(table_name)
+        columns = f"({', '.join(col['column_name'] for col in key)})"
+        conditions = []
+        for operator, bound in (('>', lower), ('<=', upper)):
+            if bound is None:
+                continue
+            values = ", ".join(
+                self.cursor.mogrify(f"%s::{col['data_type']}", (value,)).decode()
+                for col, value in zip(key, bound)
+            )
+            conditions.append(f"{columns} {operator} ({values})")
+        return conditions
+
+    def iter_key_ranges(self, table_name, last_key=None):
+        """Découpe la lecture d'une table en tranches de chunk_rows lignes de sa clé primaire
+
+        Chaque tranche est bornée par la clé de sa dernière ligne, cherchée
+        par un parcours de l'index de la clé : les requêtes restent courtes
+        quelle que soit la taille de la table. Produit une seule tranche None
+        (table entière) sans découpage ou pour une table sans clé primaire.
+
+        Toutes les tranches sont lues dans la même transaction REPEATABLE READ
+        (instantané partagé par l'export) : le découpage raccourcit les
+        requêtes, pas la transaction. Son xmin retient le nettoyage (VACUUM)
+        de toute la base jusqu'à la fin de l'export.
+        """
+        key = self.get_catalog()['tables'][table_name]['primary_key'] if self.chunk_rows else []
+        if not key:
+            yield None
+            return
+        while True:
+            query = self.build_select(table_name, [f"{col}::text" for col in key], (last_key, None))
+            # Requête déjà complète (bornes et filtres en littéraux) : exécutée
+            # sans paramètres, un % d'une valeur n'est pas pris pour un marqueur
+            self.cursor.execute(query + f" OFFSET {int(self.chunk_rows) - 1} LIMIT 1")
+            row = self.cursor.fetchone()
+            upper = list(row) if row else None
+            yield (last_key, upper)
+            if upper is None:
+                return
+            last_key = upper
+
+    def get_upsert_clause(self, table_name, columns):
+        """Retourne la clause ON CONFLICT d'une table exportée en upsert"""
+        keys = self.upsert_keys.get(table_name)
+        if not keys:
+            return ""
+        updates = [f"{col} = EXCLUDED.{col}" for col in columns if col not in keys]
+        if not updates:
+            return f"\nON CONFLICT ({', '.join(keys)}) DO NOTHING"
+        return f"\nON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + ", ".join(updates)
+
+    def get_column_encoders(self, table_name):
+        """Prépare la lecture des colonnes d'une table et leurs encodeurs SQL
+
+        Le type de chaque colonne est consulté une seule fois par table. Les
+        types sans encodeur dédié (dates, json, tableaux, intervalles, uuid,
+        enums...) sont convertis en texte par le serveur : leur représentation
+        texte (DateStyle ISO) est exacte, y compris microsecondes, fuseau
+        horaire et valeurs infinies. Retourne (expressions SELECT, encodeurs).
+        """
+        table = self.get_catalog()['tables'].get(table_name)
+        if table is None:
+            return [], ()
+        expressions = []
+        encoders = []
+        for col in table['columns']:
+            encoder = VALUE_ENCODERS.get(col['typname'])
+            if encoder is None:
+                expressions.append(f"{col['name']}::text")
+                encoders.append(encode_text)
+            else:
+                expressions.append(col['name'])
+                encoders.append(encoder)
+        return expressions, tuple(encoders)
+
+    def get_large_columns(self, table_name):
+        """Retourne les indices des colonnes dont les valeurs peuvent dépasser LARGE_VALUE_SIZE
+
+        Ce sont les colonnes à longueur variable que PostgreSQL peut stocker
+        hors ligne (TOAST) : bytea, text, varchar, json, tableaux... Les
+        char(n) en sont exclus, substring ne conservant pas leurs espaces finaux.
+        """
+        table = self.get_catalog()['tables'].get(table_name)
+        if table is None:
             return []
+        return [index for index, col in enumerate(table['columns'])
+                if col['storage'] in ('x', 'e') and col['typname'] != 'bpchar']
 
-    def get_views(self):
-        """Retourne toutes les vues avec leurs définitions"""
-        query = """
-        SELECT 
-            table_name AS view_name,
-            pg_get_viewdef(quote_ident(table_schema) || '.' || quote_ident(table_name), true) AS view_definition
-        FROM information_schema.views
-        WHERE table_schema = %s
-        ORDER BY table_name;
+    def open_data_cursor(self, table_name, expressions, key_range=None, itersize=None):
+        """Ouvre un curseur serveur sur les données d'une table (ou d'une tranche de sa clé)
+
+        Les lignes sont rapatriées par paquets de `itersize` au fil de
+        l'itération : la table n'est jamais chargée entièrement en mémoire.
+        """
+        data_cursor = self.conn.cursor(name=f"extract_{table_name}")
+        data_cursor.itersize = itersize or self.itersize
+        data_cursor.execute(self.build_select(table_name, expressions, key_range))
+        return data_cursor
+
+    def write_large_value(self, f, table_name, expression, encode, row_id, length):
+        """Écrit le littéral SQL d'une valeur trop longue, relue par tranches
+
+        La ligne est retrouvée par sa position physique (tableoid, ctid), stable
+        dans l'instantané de l'export. Chaque tranche de batch_bytes / 4
+        caractères (ou octets pour un bytea) est lue par substring puis encodée
+        et écrite aussitôt : la valeur n'est jamais entière en mémoire.
+        """
+        slice_length = max(1, self.batch_bytes // 4)
+        query = (f"SELECT substring({expression} FROM %s FOR %s) FROM {self.schema}.{table_name} "
+                 f"WHERE tableoid = %s AND ctid = %s::tid")
+        f.write("'\\x" if encode is encode_bytea else "'")
+        for start in range(1, length + 1, slice_length):
+            self.cursor.execute(query, (start, slice_length) + row_id)
+            piece = self.cursor.fetchone()[0]
+            f.write(piece.hex() if encode is encode_bytea else piece.replace("'", "''"))
+        f.write("'")
+
+    def write_large_row(self, f, insert, table_name, row, expressions, encoders, lengths, upsert_clause):
+        """Écrit dans sa propre instruction INSERT une ligne contenant des valeurs trop longues
+
+        lengths associe à l'indice de chaque valeur trop longue sa longueur ;
+        ces valeurs, lues comme NULL par le curseur, sont relues par tranches.
+        """
+        f.write(insert + "(")
+        for index, (encode, val) in enumerate(zip(encoders, row)):
+            if index:
+                f.write(", ")
+            if index in lengths:
+                self.write_large_value(f, table_name, expressions[index], encode, tuple(row[-2:]), lengths[index])
+            else:
+                f.write("NULL" if val is None else encode(val))
+        f.write(")" + upsert_clause + ";\n\n")
+
+    def write_table_inserts(self, f, table_name, stats, resume=None, batch_size=BATCH_SIZE):
+        """Écrit les INSERT d'une table au fil de la lecture, tranche par tranche
+
+        Un lot est écrit dès qu'il atteint batch_size lignes ou batch_bytes
+        octets. Les valeurs de plus de LARGE_VALUE_SIZE octets des colonnes
+        TOAST ne sont pas lues par le curseur : leur ligne est écrite seule,
+        la valeur étant relue et écrite par tranches (voir write_large_value).
+        Le curseur rapatrie alors moins de lignes par aller-retour, pour que
+        la mémoire reste de l'ordre de batch_bytes.
+
+        Les temps de lecture, d'encodage et d'écriture sont cumulés dans stats.
+        resume reprend une table interrompue après sa dernière tranche
+        terminée. Retourne le nombre de lignes écrites.
+        """
+        columns = self.get_table_columns(table_name)
+        if not columns:
+            print(f"Pas de colonnes trouvées pour la table {table_name}")
+            return 0
+        expressions, encoders = self.get_column_encoders(table_name)
+        insert = f"INSERT INTO {self.schema}.{table_name} ({', '.join(columns)}) VALUES\n"
+        upsert_clause = self.get_upsert_clause(table_name, columns)
+        # En reprise, l'en-tête de la table est déjà dans le script
+        header_written = resume is not None
+        row_count = resume['rows'] if resume else 0
+
+        # Colonnes TOAST : valeur lue seulement si elle est courte, sinon sa longueur
+        large_columns = self.get_large_columns(table_name)
+        select = list(expressions)
+        for index in large_columns:
+            oversized = f"octet_length({expressions[index]}) > {LARGE_VALUE_SIZE}"
+            select[index] = f"CASE WHEN NOT {oversized} THEN {expressions[index]} END"
+            select.append(f"CASE WHEN {oversized} THEN length({expressions[index]}) END")
+        itersize = self.itersize
+        if large_columns:
+            select += ["tableoid", "ctid::text"]
+            itersize = max(1, min(itersize, self.batch_bytes // LARGE_VALUE_SIZE))
+        width = len(columns)
+
+        def write_batch(values_list):
+            t0 = time.perf_counter()
+            f.write(insert)
+            f.write(",\n".join(values_list) + upsert_clause + ";\n\n")
+            stats['write'] += time.perf_counter() - t0
+            return len(values_list)
+
+        for key_range in self.iter_key_ranges(table_name, resume['last_key'] if resume else None):
+            data_cursor = self.open_data_cursor(table_name, select, key_range, itersize)
+            try:
+                values_list = []
+                values_size = 0
+                t0 = time.perf_counter()
+                fetched = list(islice(data_cursor, itersize))
+                stats['fetch'] += time.perf_counter() - t0
+                while fetched:
+                    if not header_written:
+                        f.write(f"-- Table: {self.schema}.{table_name}\n")
+                        header_written = True
+                    t0 = time.perf_counter()
+                    write_time = stats['write']
+                    written = 0
+                    for row in fetched:
+                        lengths = {index: row[width + n] for n, index in enumerate(large_columns)
+                                   if row[width + n] is not None}
+                        if lengths:
+                            if values_list:
+                                written += write_batch(values_list)
+                                values_list, values_size = [], 0
+                                statement_boundary(f)
+                            t1 = time.perf_counter()
+                            self.write_large_row(f, insert, table_name, row, expressions, encoders,
+                                                 lengths, upsert_clause)
+                            stats['write'] += time.perf_counter() - t1
+                            written += 1
+                            statement_boundary(f)
+                            continue
+                        values = "(" + ", ".join(["NULL" if val is None else encode(val)
+                                                  for encode, val in zip(encoders, row)]) + ")"
+                        values_list.append(values)
+                        values_size += len(values)
+                        if len(values_list) >= batch_size or values_size >= self.batch_bytes:
+                            written += write_batch(values_list)
+                            values_list, values_size = [], 0
+                            statement_boundary(f)
+                    stats['encode'] += time.perf_counter() - t0 - (stats['write'] - write_time)
+
+                    row_count += written
+                    stats['rows'] += written
+                    self.metrics.update_table(table_name, stats)
+
+                    t0 = time.perf_counter()
+                    fetched = list(islice(data_cursor, itersize))
+                    stats['fetch'] += time.perf_counter() - t0
+                if values_list:
+                    written = write_batch(values_list)
+                    row_count += written
+                    stats['rows'] += written
+                    self.metrics.update_table(table_name, stats)
+                    statement_boundary(f)
+            finally:
+                data_cursor.close()
+            if key_range and key_range[1]:
+                self.save_checkpoint(f, table_name, key_range[1], row_count)
+
+        if header_written:
+            # Le nombre de lignes n'est connu qu'une fois la table entièrement lue
+            f.write(f"-- Fin de la table {self.schema}.{table_name} ({row_count} lignes)\n\n")
+        return row_count
+
+    def copy_table_to(self, f, table_name, columns, stats, key_range=None):
+        """Recopie le flux COPY d'une table (ou d'une tranche) dans un fichier, retourne le nombre de lignes"""
+        source = f"{self.schema}.{table_name} ({', '.join(columns)})"
+        if table_name in self.table_filters or key_range is not None:
+            source = f"({self.build_select(table_name, columns, key_range)})"
+        t0 = time.perf_counter()
+        self.cursor.copy_expert(f"COPY {source} TO STDOUT", f.part_file() if isinstance(f, SplitOutput) else f)
+        # Lecture et écriture sont entremêlées dans copy_expert : mesurées ensemble
+        stats['copy'] += time.perf_counter() - t0
+        stats['rows'] += self.cursor.rowcount
+        return self.cursor.rowcount
+
+    def write_table_copy(self, f, table_name, stats, resume=None):
+        """Écrit les données d'une table sous forme de blocs COPY ... FROM stdin
+
+        Le flux COPY du serveur est recopié tel quel dans le script, sans
+        aucune conversion des valeurs côté Python. Chaque tranche de la clé
+        forme un bloc COPY complet. Retourne le nombre de lignes.
         """
+        columns = self.get_table_columns(table_name)
+        if not columns:
+            print(f"Pas de colonnes trouvées pour la table {table_name}")
+            return 0
+
+        columns_str = ", ".join(columns)
+        target = f"{self.schema}.{table_name}"
+        upsert_clause = self.get_upsert_clause(table_name, columns)
+        row_count = resume['rows'] if resume else 0
+
+        if resume is None:
+            f.write(f"-- Table: {target}\n")
+            if upsert_clause:
+                # COPY ne sait pas fusionner : charger une table de transit puis upsert
+                f.write(f"CREATE TEMP TABLE delta_{table_name} (LIKE {target}) ON COMMIT DROP;\n")
+        copy_target = f"delta_{table_name}" if upsert_clause else target
+        for key_range in self.iter_key_ranges(table_name, resume['last_key'] if resume else None):
+            f.write(f"COPY {copy_target} ({columns_str}) FROM stdin;\n")
+            try:
+                row_count += self.copy_table_to(f, table_name, columns, stats, key_range)
+            finally:
+                # Bloc toujours terminé, même en cas d'erreur : sans \. la suite
+                # du script serait lue comme des données COPY
+                f.write("\\.\n")
+            if not upsert_clause:
+                # La table de transit d'un upsert ne survit pas à la fin de la partie
+                statement_boundary(f)
+            if key_range and key_range[1]:
+                self.save_checkpoint(f, table_name, key_range[1], row_count)
+        if upsert_clause:
+            f.write(f"INSERT INTO {target} ({columns_str})\n"
+                    f"SELECT {columns_str} FROM delta_{table_name}{upsert_clause};\n")
+        f.write(f"-- Fin de la table {self.schema}.{table_name} ({row_count} lignes)\n\n")
+        return row_count
+
+    def dump_table_data(self, f, table_name, resume=None):
+        """Écrit les données d'une table dans le format demandé"""
+        stats = self.metrics.start_table(table_name)
+        start_position = output_position(f)
         try:
-            self.cursor.execute(query, (self.schema,))
-            return self.cursor.fetchall()
+            if self.data_format == 'copy':
+                row_count = self.write_table_copy(f, table_name, stats, resume)
+            else:
+                row_count = self.write_table_inserts(f, table_name, stats, resume)
         except Exception as e:
-            print(f"Erreur lors de la récupération des vues: {e}")
-            return []
+            self.recover_from_error(table_name, e)
+            stats['error'] = str(e)
+            if self.checkpoint is not None:
+                # Le point de reprise reste sur la dernière tranche terminée avant
+                # l'échec : une reprise relira cette table et les suivantes
+                print(f"Point de reprise arrêté à la table {table_name} (--resume pour reprendre)")
+                self.checkpoint = None
+            statement_boundary(f)
+            return 0
+        finally:
+            stats['bytes'] = output_position(f) - start_position
+            self.metrics.finish_table(table_name, stats)
+        # Table marquée terminée seulement si elle a été entièrement écrite
+        self.save_checkpoint(f, table_name)
+        statement_boundary(f)
+        return row_count
 
-    def get_triggers(self):
-        """Retourne tous les triggers"""
-        query = """
-        SELECT
-            trigger_name,
-            event_manipulation,
-            event_object_table,
-            action_statement
-        FROM information_schema.triggers
-        WHERE trigger_schema = %s
-        ORDER BY event_object_table, trigger_name;
+    def save_checkpoint(self, f, table_name, last_key=None, rows=0):
+        """Enregistre l'avancement dans le point de reprise, s'il est actif
+
+        Sans last_key, la table est terminée ; sinon ses lignes jusqu'à la clé
+        last_key sont écrites. La position enregistrée est la fin de la
+        dernière instruction complète : une reprise y tronque le script.
         """
+        if self.checkpoint is None:
+            return
+        state = self.checkpoint['state']
+        if last_key is None:
+            state['tables_done'].append(table_name)
+            state['current'] = None
+        else:
+            state['current'] = {'table': table_name, 'last_key': last_key, 'rows': rows}
+        state['position'] = output_position(f)
+        self.save_manifest(self.checkpoint['file'], state)
+
+    def recover_from_error(self, table_name, error):
+        """Annule la transaction après l'échec d'une table et se replace sur l'instantané"""
+        print(f"Erreur lors de l'export des données de {table_name}: {error}")
+        self.conn.rollback()
+        # Revenir sur l'instantané partagé pour les tables suivantes
+        if self.snapshot_id:
+            self.attach_snapshot(self.snapshot_id)
+
+    def run_tables_parallel(self, table_names, task):
+        """Exécute task(extracteur, index, table) sur plusieurs connexions partageant le même instantané
+
+        Les résultats sont produits dans l'ordre de table_names, au fur et à
+        mesure que les tables se terminent.
+        """
+        self.export_snapshot()
+        workers = queue.Queue()
         try:
-            self.cursor.execute(query, (self.schema,))
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Erreur lors de la récupération des triggers: {e}")
-            return []
+            for _ in range(min(self.jobs, len(table_names))):
+                workers.put(self.create_worker())
 
-    def get_indexes(self):
-        """Retourne tous les index (excluant ceux des PK et FK)"""
-        query = """
-        SELECT
-            tablename,
-            indexname,
-            indexdef
-        FROM
-            pg_indexes
-        WHERE
-            schemaname = %s
-            AND indexname NOT IN (
-                SELECT constraint_name
-                FROM information_schema.table_constraints
-                WHERE table_schema = %s
-                AND constraint_type IN ('PRIMARY KEY', 'UNIQUE', 'FOREIGN KEY')
-            )
-        ORDER BY
-            tablename, indexname;
+            def run_task(index, table_name):
+                worker = workers.get()
+                try:
+                    return task(worker, index, table_name)
+                finally:
+                    workers.put(worker)
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [executor.submit(run_task, i, name) for i, name in enumerate(table_names)]
+                for future in futures:
+                    yield future.result()
+        finally:
+            while not workers.empty():
+                workers.get().close()
+
+    def write_tables_parallel(self, f, table_names):
+        """Exporte les tables sur plusieurs connexions partageant le même instantané
+
+        Chaque table est écrite dans un fichier temporaire, puis les fichiers
+        sont recopiés dans le script en respectant l'ordre des dépendances.
         """
+        temp_dir = tempfile.mkdtemp(prefix='pg_extract_', dir=os.path.dirname(os.path.abspath(f.name)))
         try:
-            self.cursor.execute(query, (self.schema, self.schema))
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Erreur lors de la récupération des indexes: {e}")
-            return []
+            def dump_to_temp_file(worker, index, table_name):
+                temp_path = os.path.join(temp_dir, f"{index:05d}.sql")
+                with open_output(temp_path) as tf:
+                    worker.dump_table_data(tf, table_name)
+                return temp_path
 
-    def get_table_dependencies(self):
-        """Obtient un graphe de dépendances entre les tables basé sur les clés étrangères"""
-        query = """
-        SELECT
-            tc.table_name AS table_name,
-            ccu.table_name AS referenced_table
-        FROM
-            information_schema.table_constraints tc
-        JOIN
-            information_schema.constraint_column_usage ccu
-            ON tc.constraint_name = ccu.constraint_name
-        WHERE
-            tc.constraint_type = 'FOREIGN KEY'
-            AND tc.table_schema = %s
-            AND ccu.table_schema = %s
-            AND tc.table_name != ccu.table_name
+            # Assembler dans l'ordre topologique au fur et à mesure
+            for temp_path in self.run_tables_parallel(table_names, dump_to_temp_file):
+                with open(temp_path, 'r', encoding='utf-8') as tf:
+                    shutil.copyfileobj(tf, f)
+                os.remove(temp_path)
+                statement_boundary(f)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def write_sequences(self, f, sequences):
+        """Écrit la création des séquences à partir de l'état capturé dans le catalogue"""
+        if not sequences:
+            return
+        f.write("-- Séquences\n")
+        for seq in sequences:
+            f.write(f"CREATE SEQUENCE {self.schema}.{seq['sequence_name']} AS {seq['data_type']}"
+                    f" INCREMENT BY {seq['increment_by']}"
+                    f" MINVALUE {seq['min_value']} MAXVALUE {seq['max_value']}"
+                    f" START WITH {seq['start_value']} CACHE {seq['cache_size']}"
+                    f"{' CYCLE' if seq['cycle'] else ' NO CYCLE'};\n")
+        f.write("\n")
+        self.write_sequence_values(f, sequences)
+
+    def write_sequence_owners(self, f, sequences):
+        """Rattache les séquences aux colonnes qui les possèdent"""
+        owned = [seq for seq in sequences if seq['seq_details']]
+        if not owned:
+            return
+        f.write("-- Propriétaires des séquences\n")
+        for seq in owned:
+            f.write(f"ALTER SEQUENCE {self.schema}.{seq['sequence_name']} OWNED BY {self.schema}.{seq['seq_details']};\n")
+        f.write("\n")
+
+    def write_sequence_values(self, f, sequences):
+        """Écrit la réinitialisation des séquences à leur valeur capturée
+
+        Les valeurs proviennent toutes de la même requête sur pg_sequences
+        lors du chargement du catalogue : aucune requête par séquence.
+        """
+        if not sequences:
+            return
+        f.write("-- Valeurs des séquences\n")
+        for seq in sequences:
+            name = f"{self.schema}.{seq['sequence_name']}"
+            if seq['is_called']:
+                f.write(f"SELECT pg_catalog.setval('{name}', {seq['last_value']}, true);\n")
+            else:
+                f.write(f"SELECT pg_catalog.setval('{name}', {seq['start_value']}, false);\n")
+        f.write("\n")
+
+    def write_pre_data(self, f, schema_objects):
+        """Écrit la partie pré-données : schéma, types, séquences, tables, fonctions et vues"""
+        # Créer le schéma si nécessaire
+        f.write(f"CREATE SCHEMA IF NOT EXISTS {self.schema};\n\n")
+
+        # 1. Types personnalisés
+        if schema_objects['types']:
+            f.write("-- Types personnalisés\n")
+            for t in schema_objects['types']:
+                if t['typtype'] == 'e':  # Enum
+                    f.write(f"CREATE TYPE {self.schema}.{t['name']} AS ENUM ({t['enum_values']});\n")
+            f.write("\n")
+
+        # 2. Séquences (avant les tables dont les valeurs par défaut y font appel)
+        self.write_sequences(f, schema_objects['sequences'])
+
+        # 3. Tables
+        if schema_objects['tables']:
+            f.write("-- Tables\n")
+            for table in schema_objects['tables']:
+                f.write(f"CREATE TABLE {self.schema}.{table['table_name']} (\n")
+                f.write("    " + ",\n    ".join(table['columns']))
+                f.write("\n);\n\n")
+        self.write_sequence_owners(f, schema_objects['sequences'])
+
+        # 4. Fonctions
+        if schema_objects['functions']:
+            f.write("-- Fonctions\n")
+            for func in schema_objects['functions']:
+                f.write(f"{func['function_def']};\n\n")
+
+        # 5. Vues
+        if schema_objects['views']:
+            f.write("-- Vues\n")
+            for view in schema_objects['views']:
+                f.write(f"CREATE OR REPLACE VIEW {self.schema}.{view['view_name']} AS\n")
+                f.write(f"{view['view_definition']};\n\n")
+
+    def constraint_statement(self, c):
+        """Retourne l'instruction ALTER TABLE qui recrée une contrainte"""
+        prefix = f"ALTER TABLE {self.schema}.{c['table_name']} ADD CONSTRAINT {c['constraint_name']}"
+        if c['constraint_type'] == 'PRIMARY KEY':
+            return f"{prefix} PRIMARY KEY ({c['pk_columns']})"
+        elif c['constraint_type'] == 'UNIQUE':
+            return f"{prefix} UNIQUE ({c['pk_columns']})"
+        elif c['constraint_type'] == 'FOREIGN KEY':
+            statement = f"{prefix} FOREIGN KEY ({c['fk_columns']}) REFERENCES {c['ref_schema']}.{c['ref_table']} ({c['ref_columns']})"
+            if c['update_rule'] != 'NO ACTION':
+                statement += f" ON UPDATE {c['update_rule']}"
+            if c['delete_rule'] != 'NO ACTION':
+                statement += f" ON DELETE {c['delete_rule']}"
+            return statement
+        return None
+
+    def get_post_data_phases(self, schema_objects):
+        """Retourne les instructions post-données regroupées en phases
+
+        Les instructions d'une même phase sont indépendantes les unes des
+        autres et peuvent être exécutées en parallèle ; les phases doivent
+        être enchaînées dans l'ordre.
+        """
+        keys = [self.constraint_statement(c) for c in schema_objects['constraints']
+                if c['constraint_type'] in ('PRIMARY KEY', 'UNIQUE')]
+        indexes = [idx['indexdef'] for idx in schema_objects['indexes']]
+        foreign_keys = [self.constraint_statement(c) for c in schema_objects['constraints']
+                        if c['constraint_type'] == 'FOREIGN KEY']
+        triggers = [trg['trigger_def'] for trg in schema_objects['triggers']]
+        return [
+            {'name': 'indexes', 'title': 'Clés primaires, contraintes uniques et index', 'statements': keys + indexes},
+            {'name': 'foreign_keys', 'title': 'Clés étrangères', 'statements': foreign_keys},
+            {'name': 'triggers', 'title': 'Triggers', 'statements': triggers}
+        ]
+
+    def write_post_data(self, f, phases):
+        """Écrit la partie post-données : contraintes, index et triggers"""
+        for phase in phases:
+            if phase['statements']:
+                f.write(f"-- {phase['title']}\n")
+                for statement in phase['statements']:
+                    f.write(f"{statement};\n")
+                f.write("\n")
+
+    def write_run_report(self, report_file, output, output_format):
+        """Écrit le rapport JSON de l'export à côté de la sortie"""
+        size_on_disk = None
+        if os.path.isfile(output):
+            size_on_disk = os.path.getsize(output)
+        self.metrics.write_report(
+            report_file,
+            database=self.connection_params['database'],
+            schema=self.schema,
+            output=output,
+            output_format=output_format,
+            data_format={'directory': 'copy', 'parquet': 'parquet'}.get(output_format, self.data_format),
+            jobs=self.jobs,
+            compression=self.compression,
+            size_on_disk=size_on_disk
+        )
+        print(f"Rapport d'export: {report_file}")
+
+    def load_checkpoint(self, checkpoint_file, output_file):
+        """Charge le point de reprise d'un export interrompu et tronque le script à sa position
+
+        Retourne None si la reprise est impossible.
+        """
+        if not os.path.exists(checkpoint_file):
+            print(f"Aucun point de reprise trouvé ({checkpoint_file})")
+            return None
+        with open(checkpoint_file, 'r', encoding='utf-8') as cf:
+            state = json.load(cf)
+        expected = {
+            'database': self.connection_params['database'],
+            'schema': self.schema,
+            'data_format': self.data_format,
+            'chunk_rows': self.chunk_rows,
+            'subset': self.subset
+        }
+        for key, value in expected.items():
+            if state.get(key) != value:
+                print(f"Point de reprise incompatible: {key} = {state.get(key)} (attendu: {value})")
+                return None
+        if not os.path.exists(output_file) or os.path.getsize(output_file) < state['position']:
+            print(f"Le script {output_file} est plus court que le point de reprise")
+            return None
+        # Retirer la fin du script écrite après la dernière tranche terminée
+        with open(output_file, 'r+b') as of:
+            of.truncate(state['position'])
+        return state
+
+    def generate_sql_script(self, output_file, resume=False):
+        """Génère un script SQL complet pour recréer la base de données
+
+        Avec un découpage en tranches (chunk_rows), un export séquentiel non
+        compressé enregistre son avancement dans <output>.checkpoint.json après
+        chaque tranche ; resume reprend un export interrompu à ce point, dans
+        un nouvel instantané : les tables écrites avant et après l'interruption
+        ne sont alors pas lues au même instant.
+        Avec split_size, le script est découpé en parties (voir SplitOutput).
+        Retourne True si le script a été généré jusqu'au bout.
         """
+        checkpoint_file = output_file + '.checkpoint.json'
+        checkpointing = (bool(self.chunk_rows) and self.jobs == 1 and not self.compression
+                         and not self.split_size)
+        state = None
+        if resume:
+            if not checkpointing:
+                print("La reprise nécessite --chunk-rows, un export séquentiel (--jobs 1) "
+                      "et un script non compressé et non découpé")
+                return
+            state = self.load_checkpoint(checkpoint_file, output_file)
+            if state is None:
+                return
 
+        self.metrics = DumpMetrics(self.progress)
+        self.connect()
         try:
-            self.cursor.execute(query, (self.schema, self.schema))
-            dependencies = self.cursor.fetchall()
+            schema_objects = self.get_schema_objects()
+            if self.subset:
+                self.table_filters = self.build_subset_filters(self.subset)
+
+            if self.split_size:
+                output = SplitOutput(output_file, self.compression, self.split_size)
+            else:
+                output = open_output(output_file, self.compression, append=state is not None)
+            with output as f:
+                if state is None:
+                    # En-tête
+                    f.write(f"-- Script de restauration complète de la base de données {self.connection_params['database']}\n")
+                    f.write(f"-- Généré le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    f.write(f"-- Schéma: {self.schema}\n")
+                    for table_name, condition in self.subset.items():
+                        f.write(f"-- Sous-ensemble: {table_name} WHERE {condition}\n")
+                    f.write("\n")
+
+                    # Débuter une transaction
+                    f.write("BEGIN;\n\n")
+                    f.write(SCRIPT_SETTINGS)
 
-            # Créer un graphe de dépendances
-            graph = {}
-            for dep in dependencies:
-                if dep['table_name'] not in graph:
-                    graph[dep['table_name']] = []
-                graph[dep['table_name']].append(dep['referenced_table'])
+                    # 1. Schéma, types, séquences, tables, fonctions et vues
+                    start = time.perf_counter()
+                    self.write_pre_data(f, schema_objects)
+                    self.metrics.add_phase('pre_data', time.perf_counter() - start)
+                    if self.split_size:
+                        f.rotate('data')
+                    f.write("-- Données\n")
+
+                    if checkpointing:
+                        state = {
+                            'output_file': output_file,
+                            'database': self.connection_params['database'],
+                            'schema': self.schema,
+                            'data_format': self.data_format,
+                            'chunk_rows': self.chunk_rows,
+                            'subset': self.subset,
+                            'started_at': datetime.now().isoformat(timespec='seconds'),
+                            'tables_done': [],
+                            'current': None,
+                            'position': output_position(f)
+                        }
+                        self.save_manifest(checkpoint_file, state)
+                else:
+                    # Les données restantes sont lues dans un nouvel instantané
+                    print(f"Reprise de l'export commencé le {state['started_at']} "
+                          f"({len(state['tables_done'])} tables déjà exportées)")
+                    f.write(f"-- Export repris le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                if state is not None:
+                    self.checkpoint = {'file': checkpoint_file, 'state': state}
+
+                # 2. Données des tables
+                start = time.perf_counter()
+                table_names = [table['table_name'] for table in schema_objects['tables']
+                               if state is None or table['table_name'] not in state['tables_done']]
+                self.metrics.total_tables = len(table_names)
+                if self.jobs > 1 and table_names:
+                    self.write_tables_parallel(f, table_names)
+                else:
+                    current = state['current'] if state else None
+                    for table_name in table_names:
+                        resume_point = current if current and current['table'] == table_name else None
+                        self.dump_table_data(f, table_name, resume_point)
+                self.metrics.add_phase('data', time.perf_counter() - start)
+                self.metrics.end_progress()
+
+                # 3. Contraintes, index et triggers une fois les données chargées
+                start = time.perf_counter()
+                if self.split_size:
+                    f.rotate('post-data')
+                self.write_post_data(f, self.get_post_data_phases(schema_objects))
+                self.metrics.add_phase('post_data', time.perf_counter() - start)
+
+                # Commit de la transaction
+                f.write("COMMIT;\n")
+
+            if self.checkpoint is not None:
+                # Export complet : le point de reprise n'a plus lieu d'être
+                os.remove(checkpoint_file)
+                self.checkpoint = None
+            if self.split_size:
+                print(f"Script SQL généré avec succès en {len(output.parts)} parties (index: {output.index_file})")
+            else:
+                print(f"Script SQL généré avec succès dans {output_file}")
+            self.write_run_report(output_file + '.report.json', output_file, 'sql')
+            return True
 
-            return graph
         except Exception as e:
-            print(f"Erreur lors de la récupération des dépendances: {e}")
+            print(f"Erreur lors de la génération du script SQL: {e}")
+        finally:
+            self.close()
+
+    def fetch_table_fingerprints(self):
+        """Relève l'empreinte de modification de chaque table du schéma
+
+        Les compteurs de pg_stat_user_tables sont lus sur une connexion séparée
+        avant l'ouverture de l'instantané de l'export. Ils ne sont pas
+        transactionnels et le serveur les publie avec retard : ils figurent
+        dans le manifeste à titre indicatif, seul le hachage du contenu
+        décide de la reprise d'une table.
+        """
+        try:
+            conn = psycopg2.connect(**self.connection_params)
+            try:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(TABLE_FINGERPRINTS_QUERY, (self.schema,))
+                    return {row['table_name']: {key: row[key] for key in row.keys() if key != 'table_name'}
+                            for row in cur.fetchall()}
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Impossible de relever les empreintes des tables: {e}")
             return {}
 
-    def topological_sort(self, graph, all_tables):
-        """Tri topologique des tables basé sur leurs dépendances"""
-        # Initialiser tous les noeuds
-        result = []
-        visited = set()
-        temp_mark = set()
-
-        def visit(node):
-            if node in temp_mark:
-                # Détecter les cycles
-                print(f"Attention: Cycle de dépendance détecté avec la table {node}")
+    def table_content_hash(self, table_name):
+        """Hachage du contenu d'une table calculé par le serveur, indépendant de l'ordre des lignes"""
+        select = self.build_select(table_name, self.get_table_columns(table_name))
+        self.cursor.execute(
+            "SELECT count(*), coalesce(sum(('x' || substr(md5(t.*::text), 1, 16))::bit(64)::bigint::numeric), 0) "
+            f"FROM ({select}) t")
+        count, total = self.cursor.fetchone()
+        return f"{count}:{total}"
+
+    @staticmethod
+    def fingerprint_matches(previous, current):
+        """Indique si une table est inchangée depuis l'export précédent
+
+        Seul le hachage du contenu, calculé dans l'instantané de chaque export,
+        fait foi : des compteurs identiques n'excluent pas une modification
+        validée juste avant l'export et pas encore comptée.
+        """
+        if not previous or not current or 'hash' not in current:
+            return False
+        return previous.get('hash') == current['hash']
+
+    def load_reusable_tables(self, reuse_from):
+        """Retourne les tables de la sauvegarde précédente dont le fichier de données peut être repris"""
+        manifest_file = os.path.join(reuse_from, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            print(f"Pas de sauvegarde précédente dans {reuse_from} : toutes les tables sont exportées")
+            return {}
+        with open(manifest_file, 'r', encoding='utf-8') as mf:
+            previous = json.load(mf)
+        if (previous.get('schema') != self.schema or previous.get('compression') != self.compression
+                or previous.get('subset', {}) != self.subset):
+            print(f"La sauvegarde {reuse_from} n'a pas les mêmes options : toutes les tables sont exportées")
+            return {}
+        reusable = {
+            name: entry for name, entry in previous['tables'].items()
+            if not entry.get('error') and 'hash' in entry.get('fingerprint', {})
+            and entry.get('columns') == self.get_table_columns(name)
+        }
+        if not reusable:
+            print(f"La sauvegarde {reuse_from} n'a pas de hachage du contenu (--fingerprint-hash) : "
+                  f"toutes les tables sont exportées")
+        return reusable
+
+    @staticmethod
+    def reuse_data_file(source, target):
+        """Reprend le fichier de données d'une table inchangée (lien physique, sinon copie)"""
+        if os.path.exists(target):
+            if os.path.samefile(source, target):
                 return
-            if node not in visited:
-                temp_mark.add(node)
-                # Visiter d'abord les dépendances
-                if node in graph:
-                    for dep in graph[node]:
-                        visit(dep)
-                # Marquer comme visité et ajouter au résultat
-                temp_mark.discard(node)
-                visited.add(node)
-                result.append(node)
-
-        # Visiter toutes les tables
-        for table in all_tables:
-            if table not in visited:
-                visit(table)
-
-        return result
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
 
-    def get_constraints(self):
-        """Retourne toutes les contraintes (PK, FK, etc.)"""
-        query = """
-        SELECT
-            tc.constraint_name,
-            tc.table_name,
-            tc.constraint_type,
-            
-            -- Pour les clés primaires et uniques
-            CASE 
-                WHEN tc.constraint_type IN ('PRIMARY KEY', 'UNIQUE') THEN 
-                    array_to_string(array_agg(kcu.column_name ORDER BY kcu.ordinal_position), ', ')
-                ELSE NULL
-            END AS pk_columns,
-            
-            -- Pour les clés étrangères
-            CASE 
-                WHEN tc.constraint_type = 'FOREIGN KEY' THEN 
-                    array_to_string(array_agg(kcu.column_name ORDER BY kcu.ordinal_position), ', ')
-                ELSE NULL
-            END AS fk_columns,
-            
-            CASE 
-                WHEN tc.constraint_type = 'FOREIGN KEY' THEN ccu.table_name
-                ELSE NULL
-            END AS ref_table,
-            
-            CASE 
-                WHEN tc.constraint_type = 'FOREIGN KEY' THEN 
-                    array_to_string(array_agg(ccu.column_name ORDER BY kcu.ordinal_position), ', ')
-                ELSE NULL
-            END AS ref_columns,
-            
-            rc.update_rule,
-            rc.delete_rule
-        FROM
-            information_schema.table_constraints tc
-        LEFT JOIN
-            information_schema.key_column_usage kcu
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-        LEFT JOIN
-            information_schema.constraint_column_usage ccu
-            ON tc.constraint_name = ccu.constraint_name
-            AND tc.table_schema = ccu.table_schema
-        LEFT JOIN
-            information_schema.referential_constraints rc
-            ON tc.constraint_name = rc.constraint_name
-            AND tc.table_schema = rc.constraint_schema
-        WHERE
-            tc.table_schema = %s
-        GROUP BY
-            tc.constraint_name,
-            tc.table_name,
-            tc.constraint_type,
-            ccu.table_name,
-            rc.update_rule,
-            rc.delete_rule
-        ORDER BY
-            tc.table_name,
-            CASE 
-                WHEN tc.constraint_type = 'PRIMARY KEY' THEN 1
-                WHEN tc.constraint_type = 'UNIQUE' THEN 2
-                WHEN tc.constraint_type = 'FOREIGN KEY' THEN 3
-                ELSE 4
-            END;
+    def generate_directory_dump(self, output_dir, reuse_from=REUSE_FROM):
+        """Génère une sauvegarde au format répertoire
+
+        Le répertoire contient pre-data.sql (types, séquences, tables,
+        fonctions, vues), un fichier de données COPY par table dans data/,
+        post-data.sql (contraintes, index, triggers) et manifest.json qui
+        décrit les fichiers, les niveaux de dépendance des tables et les
+        phases post-données pour pg_db_restore.py.
+
+        Le manifeste conserve l'empreinte de chaque table : avec reuse_from,
+        les tables dont le hachage du contenu n'a pas changé depuis cette
+        sauvegarde reprennent son fichier de données au lieu d'être relues.
+        Le hachage est calculé avec --fingerprint-hash ou reuse_from.
+        Retourne True si la sauvegarde a été générée jusqu'au bout.
         """
+        self.metrics = DumpMetrics(self.progress)
+        fingerprints = self.fetch_table_fingerprints()
+        self.connect()
         try:
-            self.cursor.execute(query, (self.schema,))
-            return self.cursor.fetchall()
+            schema_objects = self.get_schema_objects()
+            if self.subset:
+                self.table_filters = self.build_subset_filters(self.subset)
+            reusable = self.load_reusable_tables(reuse_from) if reuse_from else {}
+            self.metrics.total_tables = len(schema_objects['tables'])
+            start = time.perf_counter()
+            os.makedirs(os.path.join(output_dir, 'data'), exist_ok=True)
+            header = (f"-- Base de données {self.connection_params['database']}, schéma {self.schema}\n"
+                      f"-- Généré le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+            with open(os.path.join(output_dir, 'pre-data.sql'), 'w', encoding='utf-8') as f:
+                f.write(header)
+                self.write_pre_data(f, schema_objects)
+
+            post_data_phases = self.get_post_data_phases(schema_objects)
+            with open(os.path.join(output_dir, 'post-data.sql'), 'w', encoding='utf-8') as f:
+                f.write(header)
+                self.write_post_data(f, post_data_phases)
+            self.metrics.add_phase('pre_data', time.perf_counter() - start)
+
+            # Données : un fichier au format COPY par table
+            start = time.perf_counter()
+            method, _ = parse_compression(self.compression)
+            extension = '.copy' + COMPRESSION_EXTENSIONS.get(method, '')
+            table_names = [table['table_name'] for table in schema_objects['tables']]
+
+            def dump_to_data_file(extractor, index, table_name):
+                data_file = os.path.join('data', f"{table_name}{extension}")
+                stats = extractor.metrics.start_table(table_name)
+                fingerprint = dict(fingerprints.get(table_name, {}))
+                try:
+                    if self.fingerprint_hash or reuse_from:
+                        fingerprint['hash'] = extractor.table_content_hash(table_name)
+                    previous = reusable.get(table_name)
+                    if previous and previous['file'] == data_file and self.fingerprint_matches(
+                            previous['fingerprint'], fingerprint):
+                        self.reuse_data_file(os.path.join(reuse_from, previous['file']),
+                                             os.path.join(output_dir, data_file))
+                        stats['rows'] = previous['rows']
+                        stats['reused'] = True
+                        return {'file': data_file, 'rows': previous['rows'], 'fingerprint': fingerprint,
+                                'reused': True}
+
+                    columns = extractor.get_table_columns(table_name)
+                    rows = 0
+                    data_path = os.path.join(output_dir, data_file)
+                    if os.path.exists(data_path):
+                        # Peut être un lien physique vers une sauvegarde précédente : ne pas l'écraser
+                        os.remove(data_path)
+                    with open_output(data_path, self.compression) as df:
+                        for key_range in extractor.iter_key_ranges(table_name):
+                            rows += extractor.copy_table_to(df, table_name, columns, stats, key_range)
+                        stats['bytes'] = output_position(df)
+                    return {'file': data_file, 'rows': rows, 'fingerprint': fingerprint}
+                except Exception as e:
+                    extractor.recover_from_error(table_name, e)
+                    stats['error'] = str(e)
+                    return {'file': data_file, 'rows': None, 'error': str(e)}
+                finally:
+                    extractor.metrics.finish_table(table_name, stats)
+
+            if self.jobs > 1 and table_names:
+                results = list(self.run_tables_parallel(table_names, dump_to_data_file))
+            else:
+                results = [dump_to_data_file(self, i, name) for i, name in enumerate(table_names)]
+            self.metrics.add_phase('data', time.perf_counter() - start)
+            self.metrics.end_progress()
+
+            levels = self.get_table_levels()
+            level_of = {table: level for level, tables in enumerate(levels) for table in tables}
+            tables = {}
+            for table_name, result in zip(table_names, results):
+                result['columns'] = self.get_table_columns(table_name)
+                result['level'] = level_of[table_name]
+                tables[table_name] = result
+
+            self.save_manifest(os.path.join(output_dir, 'manifest.json'), {
+                'format': 'directory',
+                'database': self.connection_params['database'],
+                'schema': self.schema,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'compression': self.compression,
+                'subset': self.subset,
+                'pre_data': 'pre-data.sql',
+                'post_data': 'post-data.sql',
+                'levels': levels,
+                'deferred_foreign_keys': [c['constraint_name'] for c in self.get_deferred_foreign_keys()],
+                'tables': tables,
+                'post_data_phases': [
+                    {'name': phase['name'], 'statements': phase['statements']} for phase in post_data_phases
+                ]
+            })
+            print(f"Sauvegarde au format répertoire générée avec succès dans {output_dir}")
+            self.write_run_report(os.path.join(output_dir, 'report.json'), output_dir, 'directory')
+            return True
+
         except Exception as e:
-            print(f"Erreur lors de la récupération des contraintes: {e}")
-            return []
+            print(f"Erreur lors de la génération de la sauvegarde: {e}")
+        finally:
+            self.close()
+
+    def write_table_parquet(self, path, table_name, stats):
+        """Écrit une table dans un fichier Parquet, un groupe de lignes à la fois
+
+        Chaque groupe est lu par un FETCH de PARQUET_ROW_GROUP_SIZE lignes
+        sur un curseur serveur, converti en colonnes Arrow puis écrit :
+        la mémoire utilisée reste bornée par la taille d'un groupe.
+        Retourne le nombre de lignes écrites.
+        """
+        columns = self.get_catalog()['tables'][table_name]['columns']
+        expressions, types = zip(*[parquet_column(col) for col in columns]) if columns else ((), ())
+        schema = pyarrow.schema([(col['name'], arrow_type) for col, arrow_type in zip(columns, types)])
+        method, level = parse_compression(self.compression)
+        decimals = [i for i, arrow_type in enumerate(types) if pyarrow.types.is_decimal(arrow_type)]
+        row_count = 0
 
-    def get_table_data(self, table_name):
-        """Récupère toutes les données d'une table"""
+        with pyarrow.parquet.ParquetWriter(path, schema, compression=method or 'snappy',
+                                           compression_level=level if method else None) as writer:
+            for key_range in self.iter_key_ranges(table_name):
+                data_cursor = self.open_data_cursor(table_name, expressions, key_range)
+                try:
+                    while True:
+                        t0 = time.perf_counter()
+                        rows = data_cursor.fetchmany(PARQUET_ROW_GROUP_SIZE)
+                        t1 = time.perf_counter()
+                        stats['fetch'] += t1 - t0
+                        if not rows:
+                            break
+                        values = [list(column) for column in zip(*rows)]
+                        for i in decimals:
+                            values[i] = [None if v is not None and v.is_nan() else v for v in values[i]]
+                        batch = pyarrow.Table.from_arrays(
+                            [pyarrow.array(column, type=arrow_type) for column, arrow_type in zip(values, types)],
+                            schema=schema)
+                        t2 = time.perf_counter()
+                        writer.write_table(batch)
+                        t3 = time.perf_counter()
+
+                        row_count += len(rows)
+                        stats['rows'] = row_count
+                        stats['encode'] += t2 - t1
+                        stats['write'] += t3 - t2
+                        self.metrics.update_table(table_name, stats)
+                finally:
+                    data_cursor.close()
+        return row_count
+
+    def generate_parquet_dump(self, output_dir):
+        """Exporte chaque table dans un fichier Parquet du répertoire output_dir
+
+        Les types des colonnes viennent du catalogue (voir parquet_column).
+        Les tables sont lues dans le même instantané, en parallèle si
+        demandé ; --compress choisit le codec des fichiers (snappy par défaut).
+        Retourne True si l'export a été généré jusqu'au bout.
+        """
+        if pyarrow is None:
+            print("Le module pyarrow est requis pour le format parquet (pip install pyarrow)")
+            return
+        self.metrics = DumpMetrics(self.progress)
+        self.connect()
         try:
-            # 1. Obtenir les colonnes de la table
-            self.cursor.execute(f"""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = %s AND table_name = %s 
-                ORDER BY ordinal_position
-            """, (self.schema, table_name))
-            columns = [row[0] for row in self.cursor.fetchall()]
-
-            if not columns:
-                print(f"Pas de colonnes trouvées pour la table {table_name}")
-                return []
-
-            # 2. Récupérer les données
-            query = f"SELECT {', '.join(['%s']*len(columns))} FROM {self.schema}.{table_name}"
-            query = query % tuple(columns)
-            self.cursor.execute(query)
-            data = self.cursor.fetchall()
-
-            return {
-                'columns': columns,
-                'data': data
-            }
+            self.load_catalog()
+            table_names = [table['table_name'] for table in self.get_tables()]
+            if self.subset:
+                self.table_filters = self.build_subset_filters(self.subset)
+            self.metrics.total_tables = len(table_names)
+            os.makedirs(output_dir, exist_ok=True)
+
+            def dump_to_parquet_file(extractor, index, table_name):
+                path = os.path.join(output_dir, f"{table_name}.parquet")
+                stats = extractor.metrics.start_table(table_name)
+                try:
+                    return extractor.write_table_parquet(path, table_name, stats)
+                except Exception as e:
+                    extractor.recover_from_error(table_name, e)
+                    stats['error'] = str(e)
+                    return None
+                finally:
+                    if os.path.exists(path):
+                        stats['bytes'] = os.path.getsize(path)
+                    extractor.metrics.finish_table(table_name, stats)
+
+            start = time.perf_counter()
+            if self.jobs > 1 and table_names:
+                list(self.run_tables_parallel(table_names, dump_to_parquet_file))
+            else:
+                for i, table_name in enumerate(table_names):
+                    dump_to_parquet_file(self, i, table_name)
+            self.metrics.add_phase('data', time.perf_counter() - start)
+            self.metrics.end_progress()
+
+            print(f"Export Parquet généré avec succès dans {output_dir}")
+            self.write_run_report(os.path.join(output_dir, 'report.json'), output_dir, 'parquet')
+            return True
+
         except Exception as e:
-            print(f"Erreur lors de la récupération des données de {table_name}: {e}")
-            return {'columns': [], 'data': []}
+            print(f"Erreur lors de l'export Parquet: {e}")
+        finally:
+            self.close()
+
+    @staticmethod
+    def load_manifest(manifest_file):
+        """Charge le manifeste des watermarks du précédent export incrémental"""
+        if not manifest_file or not os.path.exists(manifest_file):
+            return {'tables': {}}
+        with open(manifest_file, 'r', encoding='utf-8') as mf:
+            return json.load(mf)
+
+    @staticmethod
+    def save_manifest(manifest_file, manifest):
+        """Enregistre le manifeste des watermarks (écriture atomique)"""
+        temp_file = manifest_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as mf:
+            json.dump(manifest, mf, indent=2, ensure_ascii=False)
+        os.replace(temp_file, manifest_file)
+
+    @staticmethod
+    def watermark_to_json(value):
+        """Convertit une valeur de watermark en valeur sérialisable en JSON"""
+        if value is None or isinstance(value, (int, str)):
+            return value
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return str(value)
+
+    def prepare_delta(self, table_name, previous, watermark_columns):
+        """Calcule le filtre incrémental d'une table et son nouveau watermark
+
+        Le watermark est la colonne configurée pour la table, ou à défaut la
+        clé primaire si elle est constituée d'une seule colonne entière.
+        Retourne l'entrée du manifeste à enregistrer pour la table, ou None si
+        la table ne peut pas être exportée en upsert (pas de clé primaire).
+        """
+        primary_key = self.get_primary_key(table_name)
+        if not primary_key:
+            print(f"Table {table_name} non exportée: pas de clé primaire pour l'upsert")
+            return None
+        self.upsert_keys[table_name] = [col['column_name'] for col in primary_key]
+
+        column = watermark_columns.get(table_name)
+        if column is None and len(primary_key) == 1 and primary_key[0]['data_type'] in INTEGER_TYPES:
+            column = primary_key[0]['column_name']
+        if column is None:
+            # Sans watermark, la table est réexportée entièrement en upsert
+            print(f"Table {table_name}: pas de watermark, export complet en upsert")
+            return {}
+
+        self.cursor.execute(f"SELECT max({column}) FROM {self.schema}.{table_name}")
+        new_value = self.cursor.fetchone()[0]
+
+        conditions = []
+        if previous.get('column') == column and previous.get('value') is not None:
+            conditions.append(self.cursor.mogrify(f"{column} > %s", (previous['value'],)).decode())
+        if new_value is not None:
+            conditions.append(self.cursor.mogrify(f"{column} <= %s", (new_value,)).decode())
+            value = self.watermark_to_json(new_value)
+        else:
+            conditions.append("FALSE")
+            value = previous.get('value') if previous.get('column') == column else None
+        self.table_filters[table_name] = " AND ".join(conditions)
+
+        return {'column': column, 'value': value}
 
-    def generate_sql_script(self, output_file):
-        """Génère un script SQL complet pour recréer la base de données"""
+    def generate_delta_script(self, output_file, manifest_file, watermark_columns=None):
+        """Génère un script incrémental ne contenant que les lignes nouvelles ou modifiées
+
+        Seules les lignes au-delà du watermark enregistré lors du précédent
+        export sont lues, puis écrites en upsert (INSERT ... ON CONFLICT DO
+        UPDATE). Le manifeste n'est mis à jour qu'une fois le script complet.
+        Les suppressions ne sont pas répercutées. Une table sans clé primaire
+        ne peut pas être rejouée en upsert : elle est absente du script,
+        listée dans le manifeste (skipped_tables) et en erreur dans le rapport.
+        Retourne True si le script a été généré jusqu'au bout.
+        """
+        watermark_columns = watermark_columns or {}
+        previous_manifest = self.load_manifest(manifest_file)
+        self.metrics = DumpMetrics(self.progress)
         self.connect()
         try:
-            schema_objects = self.get_schema_objects()
+            self.load_catalog()
+            tables = self.get_tables()
+            sequences = self.get_sequences()
 
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # En-tête
-                f.write(f"-- Script de restauration complète de la base de données {self.connection_params['database']}\n")
-                f.write(f"-- Généré le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"-- Schéma: {self.schema}\n\n")
+            manifest_tables = {}
+            skipped_tables = []
+            table_names = []
+            for table in tables:
+                name = table['table_name']
+                entry = self.prepare_delta(name, previous_manifest['tables'].get(name, {}), watermark_columns)
+                if entry is None:
+                    self.metrics.skip_table(name, "pas de clé primaire pour l'upsert, table non exportée")
+                    skipped_tables.append(name)
+                    continue
+                manifest_tables[name] = entry
+                table_names.append(name)
+            self.metrics.total_tables = len(table_names)
 
-                # Débuter une transaction
+            with open_output(output_file, self.compression) as f:
+                f.write(f"-- Script incrémental de la base de données {self.connection_params['database']}\n")
+                f.write(f"-- Généré le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"-- Schéma: {self.schema}\n")
+                f.write(f"-- Précédent export: {previous_manifest.get('generated_at', 'aucun (export complet)')}\n\n")
                 f.write("BEGIN;\n\n")
+                f.write(SCRIPT_SETTINGS)
 
-                # Créer le schéma si nécessaire
-                f.write(f"CREATE SCHEMA IF NOT EXISTS {self.schema};\n\n")
+                start = time.perf_counter()
+                f.write("-- Données (delta)\n")
+                if self.jobs > 1 and table_names:
+                    self.write_tables_parallel(f, table_names)
+                else:
+                    for table_name in table_names:
+                        self.dump_table_data(f, table_name)
+                self.metrics.add_phase('data', time.perf_counter() - start)
+                self.metrics.end_progress()
 
-                # 1. Types personnalisés
-                if schema_objects['types']:
-                    f.write("-- Types personnalisés\n")
-                    for t in schema_objects['types']:
-                        if t['typtype'] == 'e':  # Enum
-                            f.write(f"CREATE TYPE {self.schema}.{t['name']} AS ENUM ({t['enum_values']});\n")
-                    f.write("\n")
+                self.write_sequence_values(f, sequences)
+                f.write("COMMIT;\n")
 
-                # 2. Tables
-                if schema_objects['tables']:
-                    f.write("-- Tables\n")
-                    for table in schema_objects['tables']:
-                        f.write(f"CREATE TABLE {self.schema}.{table['table_name']} (\n")
-                        f.write("    " + ",\n    ".join(table['columns']))
-                        f.write("\n);\n\n")
-
-                # 3. Séquences
-                if schema_objects['sequences']:
-                    f.write("-- Séquences\n")
-                    for seq in schema_objects['sequences']:
-                        if seq['seq_details']:
-                            # Les séquences sont généralement créées avec les tables,
-                            # mais on réinitialise les valeurs au besoin
-                            self.cursor.execute(f"SELECT last_value FROM {seq['sequence_name']}")
-                            last_value = self.cursor.fetchone()[0]
-                            f.write(f"SELECT pg_catalog.setval('{seq['sequence_name']}', {last_value}, true);\n")
-                    f.write("\n")
+            self.save_manifest(manifest_file, {
+                'database': self.connection_params['database'],
+                'schema': self.schema,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'output_file': output_file,
+                'tables': manifest_tables,
+                'skipped_tables': skipped_tables
+            })
+            print(f"Script incrémental généré avec succès dans {output_file}")
+            print(f"Manifeste des watermarks mis à jour: {manifest_file}")
+            self.write_run_report(output_file + '.report.json', output_file, 'delta')
+            return True
 
-                # 4. Fonctions
-                if schema_objects['functions']:
-                    f.write("-- Fonctions\n")
-                    for func in schema_objects['functions']:
-                        f.write(f"{func['function_def']};\n\n")
-
-                # 5. Vues
-                if schema_objects['views']:
-                    f.write("-- Vues\n")
-                    for view in schema_objects['views']:
-                        f.write(f"CREATE OR REPLACE VIEW {self.schema}.{view['view_name']} AS\n")
-                        f.write(f"{view['view_definition']};\n\n")
-
-                # 6. Contraintes (PK, FK, etc.)
-                if schema_objects['constraints']:
-                    f.write("-- Contraintes\n")
-                    for c in schema_objects['constraints']:
-                        if c['constraint_type'] == 'PRIMARY KEY':
-                            f.write(f"ALTER TABLE {self.schema}.{c['table_name']} ADD CONSTRAINT {c['constraint_name']} PRIMARY KEY ({c['pk_columns']});\n")
-                        elif c['constraint_type'] == 'UNIQUE':
-                            f.write(f"ALTER TABLE {self.schema}.{c['table_name']} ADD CONSTRAINT {c['constraint_name']} UNIQUE ({c['pk_columns']});\n")
-                        elif c['constraint_type'] == 'FOREIGN KEY':
-                            f.write(f"ALTER TABLE {self.schema}.{c['table_name']} ADD CONSTRAINT {c['constraint_name']} FOREIGN KEY ({c['fk_columns']}) REFERENCES {self.schema}.{c['ref_table']} ({c['ref_columns']})")
-                            if c['update_rule'] != 'NO ACTION':
-                                f.write(f" ON UPDATE {c['update_rule']}")
-                            if c['delete_rule'] != 'NO ACTION':
-                                f.write(f" ON DELETE {c['delete_rule']}")
-                            f.write(";\n")
-                    f.write("\n")
+        except Exception as e:
+            print(f"Erreur lors de la génération du script incrémental: {e}")
+        finally:
+            self.close()
 
-                # 7. Index
-                if schema_objects['indexes']:
-                    f.write("-- Index\n")
-                    for idx in schema_objects['indexes']:
-                        f.write(f"{idx['indexdef']};\n")
-                    f.write("\n")
+    def read_script_header(self, script_path, compression):
+        """Relit les filtres de sous-ensemble notés en tête d'un script SQL"""
+        subset = {}
+        with open_input(script_path, compression) as f:
+            for line in f:
+                if line.startswith('BEGIN;'):
+                    break
+                if line.startswith('-- Sous-ensemble: '):
+                    table_name, _, condition = line[len('-- Sous-ensemble: '):].rstrip('\n').partition(' WHERE ')
+                    subset[table_name] = condition
+        return subset
 
-                # 8. Triggers
-                if schema_objects['triggers']:
-                    f.write("-- Triggers\n")
-                    for trg in schema_objects['triggers']:
-                        f.write(f"CREATE TRIGGER {trg['trigger_name']} {trg['event_manipulation']} ON {self.schema}.{trg['event_object_table']} FOR EACH ROW {trg['action_statement']};\n")
-                    f.write("\n")
+    def hash_script_tables(self, script_path, compression):
+        """Calcule l'empreinte des blocs COPY d'un script SQL, table par table
 
-                # 9. Données des tables
-                f.write("-- Données\n")
-                for table in schema_objects['tables']:
-                    table_data = self.get_table_data(table['table_name'])
-                    if table_data['data']:
-                        f.write(f"-- Table: {self.schema}.{table['table_name']} ({len(table_data['data'])} lignes)\n")
-
-                        batch_size = 1000  # Traiter par lots pour les grandes tables
-                        columns_str = ", ".join(table_data['columns'])
-
-                        for i in range(0, len(table_data['data']), batch_size):
-                            batch = table_data['data'][i:i+batch_size]
-
-                            f.write(f"INSERT INTO {self.schema}.{table['table_name']} ({columns_str}) VALUES\n")
-
-                            values_list = []
-                            for row in batch:
-                                values = []
-                                for val in row:
-                                    if val is None:
-                                        values.append("NULL")
-                                    elif isinstance(val, str):
-                                        # Échapper les apostrophes
-                                        escaped_val = val.replace("'", "''")
-                                        values.append(f"'{escaped_val}'")
-                                    elif isinstance(val, datetime):
-                                        values.append(f"'{val.strftime('%Y-%m-%d %H:%M:%S')}'")
-                                    elif isinstance(val, bool):
-                                        values.append("TRUE" if val else "FALSE")
-                                    elif isinstance(val, (bytes, bytearray)):
-                                        # Convertir en format hexadécimal pour les bytea
-                                        hex_val = ''.join('\\x{:02x}'.format(b) for b in val)
-                                        values.append(f"'{hex_val}'")
-                                    else:
-                                        values.append(str(val))
-
-                                values_list.append("(" + ", ".join(values) + ")")
-
-                            f.write(",\n".join(values_list) + ";\n\n")
+        Une table découpée en tranches a plusieurs blocs : leurs empreintes
+        s'additionnent. Retourne (tables, tables écrites en INSERT).
+        """
+        copy_prefix = f"COPY {self.schema}."
+        insert_prefix = f"INSERT INTO {self.schema}."
+        tables = {}
+        insert_tables = set()
+        with open_input(script_path, compression) as f:
+            for line in f:
+                if line.startswith(copy_prefix) and line.endswith(' FROM stdin;\n'):
+                    table_name, _, columns = line[len(copy_prefix):-len(' FROM stdin;\n')].partition(' (')
+                    table = tables.setdefault(table_name, {'columns': columns[:-1].split(', '), 'count': 0, 'total': 0})
+                    for data_line in f:
+                        if data_line == '\\.\n':
+                            break
+                        table['total'] += copy_line_hash(data_line.rstrip('\n'))
+                        table['count'] += 1
+                elif line.startswith(insert_prefix):
+                    insert_tables.add(line[len(insert_prefix):].partition(' ')[0])
+        return ({name: {'columns': t['columns'], 'hash': f"{t['count']}:{t['total']}"} for name, t in tables.items()},
+                insert_tables)
 
-                # Commit de la transaction
-                f.write("COMMIT;\n")
+    def verify_dump(self, path):
+        """Compare une sauvegarde à la base : nombre de lignes et empreinte de chaque table
 
-                print(f"Script SQL généré avec succès dans {output_file}")
+        L'empreinte est la somme des 64 premiers bits de md5(ligne::text) :
+        le serveur la calcule sans rien transférer, et elle est recalculée
+        côté client en relisant les données COPY de la sauvegarde. Les deux
+        calculs s'exécutent en même temps, sur plusieurs connexions et
+        processus. Seules les données au format COPY (format répertoire ou
+        --data-format copy) sont vérifiables. Retourne la liste des tables
+        qui diffèrent, ou None si la vérification n'a pas pu avoir lieu.
+        """
+        start = time.perf_counter()
+        self.metrics = DumpMetrics()
+        is_directory = os.path.isdir(path)
+        if is_directory:
+            with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as mf:
+                manifest = json.load(mf)
+            compression = manifest.get('compression')
+            self.subset = manifest.get('subset') or {}
+            if manifest.get('schema') != self.schema:
+                print(f"La sauvegarde porte sur le schéma {manifest.get('schema')}, pas sur {self.schema}")
+                return None
+        else:
+            compression = next((method for method, extension in COMPRESSION_EXTENSIONS.items()
+                                if path.endswith(extension)), None)
+            self.subset = self.read_script_header(path, compression)
+
+        self.connect()
+        try:
+            self.load_catalog()
+            if self.subset:
+                self.table_filters = self.build_subset_filters(self.subset)
+            catalog_tables = self.get_catalog()['tables']
+            dump_tables = {}
+            insert_tables = set()
+            file_hashes = {}
+
+            with ThreadPoolExecutor(max_workers=1) as server, ProcessPoolExecutor(max_workers=self.jobs) as files:
+                if is_directory:
+                    # Un processus par fichier de données, pendant que le serveur calcule les siennes
+                    for name, entry in manifest['tables'].items():
+                        dump_tables[name] = entry
+                        if not entry.get('error'):
+                            file_hashes[name] = files.submit(
+                                hash_copy_file, os.path.join(path, entry['file']), compression)
+                    names = [name for name in catalog_tables if name in file_hashes]
+                else:
+                    # Les tables à comparer ne sont connues qu'après lecture du script
+                    names = list(catalog_tables)
+
+                if self.jobs > 1 and names:
+                    server_task = server.submit(lambda: list(self.run_tables_parallel(
+                        names, lambda worker, index, name: worker.table_content_hash(name))))
+                else:
+                    server_task = server.submit(lambda: [self.table_content_hash(name) for name in names])
+
+                if not is_directory:
+                    dump_tables, insert_tables = self.hash_script_tables(path, compression)
+                    file_hashes = {name: entry['hash'] for name, entry in dump_tables.items()}
+                server_hashes = dict(zip(names, server_task.result()))
+                file_hashes = {name: value if isinstance(value, str) else value.result()
+                               for name, value in file_hashes.items()}
+
+            differences = []
+            for name in sorted(set(catalog_tables) | set(dump_tables) | insert_tables):
+                if name not in catalog_tables:
+                    status = "absente de la base"
+                elif name in insert_tables:
+                    status = "non vérifiable (données au format INSERT)"
+                elif name not in dump_tables:
+                    status = "absente de la sauvegarde"
+                elif dump_tables[name].get('error'):
+                    status = f"en erreur lors de l'export ({dump_tables[name]['error']})"
+                elif dump_tables[name]['columns'] != self.get_table_columns(name):
+                    status = "colonnes différentes"
+                elif file_hashes[name] == server_hashes[name]:
+                    print(f"  OK          {name} ({file_hashes[name].split(':')[0]} lignes)")
+                    continue
+                else:
+                    status = (f"{file_hashes[name].split(':')[0]} lignes dans la sauvegarde, "
+                              f"{server_hashes[name].split(':')[0]} dans la base")
+                print(f"  DIFFÉRENT   {name}: {status}")
+                differences.append(name)
+
+            duration = time.perf_counter() - start
+            if differences:
+                print(f"Vérification terminée en {duration:.2f} secondes : {len(differences)} table(s) diffèrent")
+            else:
+                print(f"Vérification terminée en {duration:.2f} secondes : la sauvegarde correspond à la base")
+            return differences
 
         except Exception as e:
-            print(f"Erreur lors de la génération du script SQL: {e}")
+            print(f"Erreur lors de la vérification de la sauvegarde: {e}")
+            return None
         finally:
             self.close()
 
@@ -565,16 +2447,74 @@ def main():
     parser.add_argument('--port', type=int, default=DB_PORT, help=f'Port du serveur PostgreSQL (défaut: {DB_PORT})')
     parser.add_argument('--database', default=DB_NAME, help=f'Nom de la base de données (défaut: {DB_NAME})')
     parser.add_argument('--user', default=DB_USER, help=f'Nom d\'utilisateur PostgreSQL (défaut: {DB_USER})')
-    parser.add_argument('--password', default=DB_PASSWORD, help=f'Mot de passe PostgreSQL')
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD', DB_PASSWORD),
+                        help='Mot de passe PostgreSQL (défaut: variable PGPASSWORD)')
     parser.add_argument('--schema', default=DB_SCHEMA, help=f'Schéma à extraire (défaut: {DB_SCHEMA})')
     parser.add_argument('--output', default=OUTPUT_FILE, help='Fichier de sortie (défaut: nom_bdd_date.sql)')
+    parser.add_argument('--format', choices=['sql', 'directory', 'parquet'], default=OUTPUT_FORMAT,
+                        help=f'Script SQL unique, répertoire avec un fichier COPY par table et un manifeste, '
+                             f'ou un fichier Parquet par table (défaut: {OUTPUT_FORMAT})')
+    parser.add_argument('--data-format', choices=['insert', 'copy'], default=DATA_FORMAT,
+                        help=f'Format de la section données : INSERT multi-lignes ou blocs COPY (défaut: {DATA_FORMAT})')
+    parser.add_argument('--jobs', type=int, default=JOBS,
+                        help=f'Nombre de connexions exportant les tables en parallèle (défaut: {JOBS})')
+    parser.add_argument('--compress', default=COMPRESSION, metavar='gzip|zstd[:niveau]',
+                        help='Compresse le script à la volée (ex: gzip, zstd:19) ; codec des fichiers en format parquet')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Exporte uniquement les lignes au-delà des watermarks du précédent export')
+    parser.add_argument('--manifest', default=MANIFEST_FILE,
+                        help='Manifeste JSON des watermarks (défaut: nom_bdd_schema_watermarks.json à côté de la sortie)')
+    parser.add_argument('--watermark', action='append', default=[], metavar='TABLE=COLONNE',
+                        help='Colonne de watermark d\'une table (ex: transactions=updated_at), répétable')
+    parser.add_argument('--itersize', type=int, default=ITERSIZE, help=f'Lignes lues par aller-retour du curseur serveur (défaut: {ITERSIZE})')
+    parser.add_argument('--batch-bytes', default=BATCH_BYTES, metavar='TAILLE',
+                        help='Taille maximale d\'une instruction INSERT (ex: 16M) ; les valeurs bytea/text '
+                             f'de plus de {LARGE_VALUE_SIZE // 1024}k sont écrites par tranches (défaut: {BATCH_BYTES // 1024 ** 2}M)')
+    parser.add_argument('--subset', action='append', default=[], metavar='TABLE=CONDITION',
+                        help='Exporte un sous-ensemble cohérent à partir d\'une table racine filtrée '
+                             '(ex: "transactions=date_transaction >= \'2024-01-01\'"), répétable')
+    parser.add_argument('--reuse-from', default=REUSE_FROM, metavar='REPERTOIRE',
+                        help='Format répertoire : reprend les fichiers des tables inchangées depuis cette sauvegarde')
+    parser.add_argument('--fingerprint-hash', action='store_true', default=FINGERPRINT_HASH,
+                        help='Enregistre un hachage du contenu calculé par le serveur (lecture complète côté serveur), '
+                             'nécessaire pour reprendre une table avec --reuse-from (qui l\'active)')
+    parser.add_argument('--split-size', default=SPLIT_SIZE, metavar='TAILLE',
+                        help='Découpe le script SQL en parties d\'environ TAILLE octets avant compression (ex: 500M, 2G), '
+                             'avec un index <sortie>.index.json')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help='Lit les tables par tranches de N lignes de leur clé primaire, avec point de reprise '
+                             '(toutes les tranches restent dans la même transaction, qui retient le VACUUM jusqu\'à la fin)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Reprend un export interrompu depuis son point de reprise (<sortie>.checkpoint.json)')
+    parser.add_argument('--verify', metavar='SAUVEGARDE',
+                        help='Vérifie une sauvegarde (script SQL ou répertoire, données COPY) contre la base au lieu d\'exporter')
+    parser.add_argument('--no-progress', action='store_true', help='Désactive l\'affichage de la progression par table')
 
     args = parser.parse_args()
 
+    if args.verify:
+        verifier = PostgreSQLExtractor(
+            host=args.host,
+            port=args.port,
+            database=args.database,
+            user=args.user,
+            password=args.password,
+            schema=args.schema,
+            jobs=args.jobs
+        )
+        differences = verifier.verify_dump(args.verify)
+        if differences is None or differences:
+            raise SystemExit(1)
+        return
+
     if args.output is None:
         # Nom par défaut pour le fichier de sortie
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        args.output = f"{args.database}_{timestamp}.sql"
+        args.output = f"{args.database}_{timestamp}" + ('.sql' if args.format == 'sql' else '')
+
+    method, _ = parse_compression(args.compress)
+    if args.format == 'sql' and method and not args.output.endswith(COMPRESSION_EXTENSIONS[method]):
+        args.output += COMPRESSION_EXTENSIONS[method]
 
     extractor = PostgreSQLExtractor(
         host=args.host,
@@ -582,10 +2522,41 @@ def main():
         database=args.database,
         user=args.user,
         password=args.password,
-        schema=args.schema
+        schema=args.schema,
+        itersize=args.itersize,
+        data_format=args.data_format,
+        jobs=args.jobs,
+        compression=args.compress,
+        progress=PROGRESS and not args.no_progress,
+        chunk_rows=args.chunk_rows,
+        subset=dict(spec.split('=', 1) for spec in args.subset),
+        fingerprint_hash=args.fingerprint_hash,
+        split_size=args.split_size,
+        batch_bytes=args.batch_bytes
     )
 
-    extractor.generate_sql_script(args.output)
+    if args.incremental and args.subset:
+        print("Les options --incremental et --subset ne peuvent pas être combinées")
+        raise SystemExit(1)
+
+    if args.incremental:
+        manifest_file = args.manifest or os.path.join(
+            os.path.dirname(os.path.abspath(args.output)), f"{args.database}_{args.schema}_watermarks.json")
+        watermark_columns = dict(spec.split('=', 1) for spec in args.watermark)
+        succeeded = extractor.generate_delta_script(args.output, manifest_file, watermark_columns)
+    elif args.format == 'directory':
+        succeeded = extractor.generate_directory_dump(args.output, reuse_from=args.reuse_from)
+    elif args.format == 'parquet':
+        succeeded = extractor.generate_parquet_dump(args.output)
+    else:
+        succeeded = extractor.generate_sql_script(args.output, resume=args.resume)
+
+    # Code de retour non nul si l'export a échoué ou si une table n'a pas pu être exportée
+    failed_tables = extractor.metrics.failed_tables()
+    if failed_tables:
+        print(f"Export incomplet: {len(failed_tables)} table(s) en erreur ({', '.join(failed_tables)})")
+    if not succeeded or failed_tables:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Export de plusieurs bases et schémas en parallèle avec pg_db_extractor.py,
+# dans une limite globale de connexions, les plus gros en premier
+
+# Configuration du serveur - Modifie ces valeurs selon ta configuration
+DB_HOST = 'localhost'      # Adresse du serveur PostgreSQL
+DB_PORT = 5434             # Port du serveur PostgreSQL
+DB_USER = 'postgres'       # Nom d'utilisateur
+DB_PASSWORD = 'trinita'    # Mot de passe
+TARGETS = []               # Cibles 'base' (schéma public), 'base.schema' ou 'base.*' (tous les schémas)
+OUTPUT_DIR = None          # None = export_<date> dans le répertoire courant
+MAX_CONNECTIONS = 8        # Connexions ouvertes au total par tous les exports en cours
+MAX_JOBS = 4               # Nombre maximal de connexions --jobs d'un seul export
+
+import psycopg2
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import argparse
+from datetime import datetime
+
+EXTRACTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pg_db_extractor.py')
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+# Taille estimée de chaque schéma : pages des tables et de leur table TOAST
+# d'après pg_class.relpages (mis à jour par VACUUM et ANALYZE). Un schéma sans
+# table (vues, fonctions, séquences seulement) est listé avec 0 table.
+SCHEMA_SIZES_QUERY = """
+SELECT n.nspname, count(c.oid) AS tables, coalesce(sum(c.relpages + coalesce(t.relpages, 0)), 0)::bigint AS pages
+FROM pg_namespace n
+LEFT JOIN pg_class c ON c.relnamespace = n.oid AND c.relkind IN ('r', 'p')
+LEFT JOIN pg_class t ON t.oid = c.reltoastrelid
+WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg\\_%'
+GROUP BY n.nspname;
+"""
+
+
+def connections_needed(jobs):
+    """Connexions ouvertes par un export : la principale plus une par job en parallèle"""
+    return 1 if jobs <= 1 else jobs + 1
+
+
+class DumpOrchestrator:
+    def __init__(self, host, port, user, password, targets, output_dir, max_connections=MAX_CONNECTIONS,
+                 max_jobs=MAX_JOBS, output_format='sql', compression=None, extractor_args=None):
+        """Initialise l'export de plusieurs cibles base/schéma"""
+        self.connection_params = {
+            'host': host,
+            'port': port,
+            'user': user,
+            'password': password
+        }
+        self.targets = targets
+        self.output_dir = output_dir
+        self.max_connections = max(1, max_connections)
+        self.max_jobs = max(1, max_jobs)
+        self.output_format = output_format
+        self.compression = compression
+        self.extractor_args = extractor_args or []
+
+    def estimate_targets(self):
+        """Résout les cibles et estime leur taille, une connexion par base
+
+        Retourne la liste des cibles triée de la plus grosse à la plus petite,
+        et celle des cibles impossibles à exporter (base inaccessible, schéma
+        inexistant) avec leur erreur.
+        """
+        wanted = {}
+        for spec in self.targets:
+            database, _, schema = spec.partition('.')
+            wanted.setdefault(database, []).append(schema or 'public')
+
+        plan = []
+        failed = []
+        for database, schemas in wanted.items():
+            try:
+                conn = psycopg2.connect(**self.connection_params, database=database)
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(SCHEMA_SIZES_QUERY)
+                        sizes = {name: (tables, pages) for name, tables, pages in cur.fetchall()}
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Base {database} en échec: {e}")
+                failed += [{'database': database, 'schema': schema, 'returncode': None,
+                            'error': str(e).strip()} for schema in dict.fromkeys(schemas)]
+                continue
+
+            for schema in (sorted(sizes) if '*' in schemas else dict.fromkeys(schemas)):
+                if schema not in sizes:
+                    print(f"Schéma {database}.{schema} en échec: schéma inexistant")
+                    failed.append({'database': database, 'schema': schema, 'returncode': None,
+                                   'error': 'schéma inexistant'})
+                    continue
+                tables, pages = sizes[schema]
+                plan.append({'database': database, 'schema': schema, 'tables': tables, 'pages': pages})
+
+        plan.sort(key=lambda target: target['pages'], reverse=True)
+        return plan, failed
+
+    def plan_jobs(self, target, pending, free):
+        """Nombre de jobs d'un export qui démarre avec `free` connexions disponibles
+
+        Les connexions libres sont partagées entre les cibles restantes au
+        prorata de leur taille : la plus grosse, lancée en premier, reçoit
+        le plus de connexions et sa durée se rapproche de celle de l'ensemble.
+        """
+        total_pages = sum(t['pages'] for t in pending) + target['pages']
+        if total_pages:
+            share = round(free * target['pages'] / total_pages)
+        else:
+            share = free // (len(pending) + 1)
+        share = max(1, min(share, free))
+        jobs = share - 1 if share >= 3 else 1
+        return max(1, min(jobs, self.max_jobs, target['tables']))
+
+    def output_path(self, target):
+        """Fichier ou répertoire de sortie d'une cible"""
+        path = os.path.join(self.output_dir, f"{target['database']}_{target['schema']}")
+        if self.output_format == 'sql':
+            path += '.sql'
+            method = self.compression.partition(':')[0] if self.compression else None
+            if method:
+                path += COMPRESSION_EXTENSIONS[method]
+        return path
+
+    def run_target(self, target, jobs):
+        """Lance pg_db_extractor.py pour une cible et attend sa fin
+
+        Le mot de passe est transmis par PGPASSWORD et non sur la ligne de
+        commande, visible de tous les utilisateurs du serveur (ps).
+        """
+        output = self.output_path(target)
+        command = [sys.executable, EXTRACTOR,
+                   '--host', str(self.connection_params['host']),
+                   '--port', str(self.connection_params['port']),
+                   '--user', self.connection_params['user'],
+                   '--database', target['database'],
+                   '--schema', target['schema'],
+                   '--output', output,
+                   '--format', self.output_format,
+                   '--jobs', str(jobs),
+                   '--no-progress'] + self.extractor_args
+        if self.compression:
+            command += ['--compress', self.compression]
+        log_file = os.path.splitext(output)[0] + '.log' if self.output_format == 'sql' else output + '.log'
+        start = time.perf_counter()
+        with open(log_file, 'w', encoding='utf-8') as log:
+            returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT,
+                                        env={**os.environ, 'PGPASSWORD': self.connection_params['password']}).returncode
+        return {
+            'output': output,
+            'log': log_file,
+            'returncode': returncode,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+    def run(self):
+        """Exporte toutes les cibles et retourne le rapport de l'ensemble
+
+        Les cibles sont lancées de la plus grosse à la plus petite tant que
+        des connexions restent disponibles ; chaque fin d'export libère ses
+        connexions pour les suivantes.
+        """
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        pending, results = self.estimate_targets()
+        print(f"{len(pending)} cible(s) à exporter avec au plus {self.max_connections} connexions")
+
+        finished = queue.Queue()
+        free = self.max_connections
+        running = 0
+
+        def run_and_notify(target, jobs, connections):
+            try:
+                result = self.run_target(target, jobs)
+            except Exception as e:
+                result = {'returncode': None, 'error': str(e)}
+            finished.put((target, jobs, connections, result))
+
+        while pending or running:
+            # Lancer les plus grosses cibles tant que des connexions sont libres
+            while pending and free > 0:
+                target = pending.pop(0)
+                jobs = self.plan_jobs(target, pending, free)
+                connections = min(connections_needed(jobs), free)
+                free -= connections
+                running += 1
+                target['started_at'] = round(time.perf_counter() - start, 3)
+                print(f"Début {target['database']}.{target['schema']} "
+                      f"({target['pages']} pages, {target['tables']} tables, --jobs {jobs})")
+                threading.Thread(target=run_and_notify, args=(target, jobs, connections), daemon=True).start()
+
+            target, jobs, connections, result = finished.get()
+            free += connections
+            running -= 1
+            results.append({**target, 'jobs': jobs, **result})
+            status = "terminé" if result['returncode'] == 0 else f"échec (code {result['returncode']})"
+            print(f"{target['database']}.{target['schema']}: {status} en {result.get('seconds', 0):.2f} secondes")
+
+        wall_seconds = time.perf_counter() - start
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'max_connections': self.max_connections,
+            'wall_seconds': round(wall_seconds, 3),
+            # Durée d'un enchaînement des mêmes exports l'un après l'autre
+            'serial_seconds': round(sum(r.get('seconds', 0) for r in results), 3),
+            'longest_target_seconds': max((r.get('seconds', 0) for r in results), default=0),
+            'targets': results
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Exporter plusieurs bases et schémas en parallèle avec pg_db_extractor.py. '
+                    'Les options non reconnues sont transmises à chaque export (ex: --data-format copy).')
+    parser.add_argument('--host', default=DB_HOST, help=f'Hôte du serveur PostgreSQL (défaut: {DB_HOST})')
+    parser.add_argument('--port', type=int, default=DB_PORT, help=f'Port du serveur PostgreSQL (défaut: {DB_PORT})')
+    parser.add_argument('--user', default=DB_USER, help=f'Nom d\'utilisateur PostgreSQL (défaut: {DB_USER})')
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD', DB_PASSWORD),
+                        help='Mot de passe PostgreSQL (défaut: variable PGPASSWORD)')
+    parser.add_argument('--target', action='append', default=list(TARGETS), metavar='BASE[.SCHEMA]',
+                        help='Cible à exporter : base (schéma public), base.schema ou base.* (tous les schémas), répétable')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='Répertoire des exports (défaut: export_<date>)')
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                        help=f'Connexions ouvertes au total par les exports en cours (défaut: {MAX_CONNECTIONS})')
+    parser.add_argument('--max-jobs', type=int, default=MAX_JOBS,
+                        help=f'Nombre maximal de --jobs d\'un seul export (défaut: {MAX_JOBS})')
+    parser.add_argument('--format', choices=['sql', 'directory', 'parquet'], default='sql',
+                        help='Format de sortie de chaque export (défaut: sql)')
+    parser.add_argument('--compress', metavar='gzip|zstd[:niveau]', help='Compression de chaque export')
+
+    args, extractor_args = parser.parse_known_args()
+    if not args.target:
+        parser.error("au moins une cible --target est requise")
+
+    output_dir = args.output_dir or f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    orchestrator = DumpOrchestrator(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        targets=args.target,
+        output_dir=output_dir,
+        max_connections=args.max_connections,
+        max_jobs=args.max_jobs,
+        output_format=args.format,
+        compression=args.compress,
+        extractor_args=extractor_args
+    )
+    report = orchestrator.run()
+
+    report_file = os.path.join(output_dir, 'orchestrator_report.json')
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    failures = [t for t in report['targets'] if t['returncode'] != 0]
+    print(f"{len(report['targets'])} export(s) en {report['wall_seconds']:.2f} secondes "
+          f"(la plus longue: {report['longest_target_seconds']:.2f} s, en série: {report['serial_seconds']:.2f} s)")
+    print(f"Rapport: {report_file}")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Restauration parallèle d'une sauvegarde au format répertoire
+# produite par pg_db_extractor.py --format directory
+
+# Configuration de la base de données cible - Modifie ces valeurs selon ta configuration
+DB_HOST = 'localhost'      # Adresse du serveur PostgreSQL
+DB_PORT = 5434             # Port du serveur PostgreSQL
+DB_NAME = 'db_cera'        # Nom de la base de données cible (doit exister)
+DB_USER = 'postgres'       # Nom d'utilisateur
+DB_PASSWORD = 'trinita'    # Mot de passe
+DUMP_DIR = None            # Répertoire de la sauvegarde (contient manifest.json)
+JOBS = 4                   # Nombre de connexions utilisées en parallèle
+
+import psycopg2
+import psycopg2.errors
+import gzip
+import json
+import os
+import queue
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def open_data_file(path, compression):
+    """Ouvre un fichier de données en lecture binaire, décompressé à la volée"""
+    method = compression.partition(':')[0] if compression else None
+    if method == 'gzip':
+        return gzip.open(path, 'rb')
+    if method == 'zstd':
+        if zstandard is None:
+            raise ValueError("Le module zstandard est requis pour lire une sauvegarde zstd (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    return open(path, 'rb')
+
+
+class PostgreSQLRestorer:
+    def __init__(self, host, port, database, user, password, dump_dir, jobs=JOBS):
+        """Initialise la restauration d'une sauvegarde au format répertoire"""
+        self.connection_params = {
+            'host': host,
+            'port': port,
+            'database': database,
+            'user': user,
+            'password': password
+        }
+        self.dump_dir = dump_dir
+        self.jobs = max(1, jobs)
+        self.manifest = None
+
+    def load_manifest(self):
+        """Charge le manifeste de la sauvegarde"""
+        with open(os.path.join(self.dump_dir, 'manifest.json'), 'r', encoding='utf-8') as mf:
+            self.manifest = json.load(mf)
+        if self.manifest.get('format') != 'directory':
+            raise ValueError(f"{self.dump_dir} ne contient pas une sauvegarde au format répertoire")
+        return self.manifest
+
+    def connect(self):
+        """Ouvre une nouvelle connexion à la base cible
+
+        Les fichiers de données sont envoyés tels quels au COPY : la connexion
+        doit être en UTF-8 comme eux, quel que soit l'encodage de la base.
+        """
+        return psycopg2.connect(**self.connection_params, client_encoding='UTF8')
+
+    def execute_sql_file(self, file_name):
+        """Exécute un fichier SQL complet dans une seule transaction"""
+        with open(os.path.join(self.dump_dir, file_name), 'r', encoding='utf-8') as f:
+            script = f.read()
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(script)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run_parallel(self, items, task):
+        """Exécute task(connexion, élément) pour chaque élément sur un pool de connexions
+
+        Retourne la liste des erreurs rencontrées sous forme (élément, message).
+        """
+        connections = queue.Queue()
+        errors = []
+        try:
+            for _ in range(min(self.jobs, len(items))):
+                connections.put(self.connect())
+
+            def run_task(item):
+                conn = connections.get()
+                try:
+                    task(conn, item)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    errors.append((item, str(e)))
+                finally:
+                    connections.put(conn)
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                list(executor.map(run_task, items))
+        finally:
+            while not connections.empty():
+                connections.get().close()
+        return errors
+
+    def load_table(self, conn, table_name):
+        """Charge le fichier de données d'une table par COPY"""
+        table = self.manifest['tables'][table_name]
+        target = f"{self.manifest['schema']}.{table_name} ({', '.join(table['columns'])})"
+        path = os.path.join(self.dump_dir, table['file'])
+        with open_data_file(path, self.manifest.get('compression')) as data:
+            with conn.cursor() as cur:
+                cur.copy_expert(f"COPY {target} FROM STDIN", data)
+
+    def execute_statement(self, conn, statement):
+        """Exécute une instruction post-données, avec une nouvelle tentative en cas d'interblocage"""
+        for attempt in range(2):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(statement)
+                return
+            except psycopg2.errors.DeadlockDetected:
+                conn.rollback()
+                if attempt == 1:
+                    raise
+
+    def restore(self):
+        """Restaure la sauvegarde : pré-données, données par niveau, puis post-données"""
+        start = datetime.now()
+        self.load_manifest()
+        errors = []
+
+        # 1. Types, séquences, tables, fonctions et vues
+        print("Restauration des pré-données...")
+        self.execute_sql_file(self.manifest['pre_data'])
+
+        # 2. Données, niveau par niveau : les tables d'un même niveau sont indépendantes
+        for level, tables in enumerate(self.manifest['levels']):
+            to_load = []
+            for table_name in tables:
+                if self.manifest['tables'][table_name].get('error'):
+                    print(f"Table {table_name} ignorée: erreur lors de l'export ({self.manifest['tables'][table_name]['error']})")
+                    errors.append((table_name, f"non exportée: {self.manifest['tables'][table_name]['error']}"))
+                else:
+                    to_load.append(table_name)
+            print(f"Chargement du niveau {level} ({len(to_load)} tables)...")
+            errors += self.run_parallel(to_load, self.load_table)
+
+        # 3. Contraintes, index et triggers, phase par phase
+        for phase in self.manifest['post_data_phases']:
+            if phase['statements']:
+                print(f"Post-données: {phase['name']} ({len(phase['statements'])} instructions)...")
+                errors += self.run_parallel(phase['statements'], self.execute_statement)
+
+        duration = (datetime.now() - start).total_seconds()
+        if errors:
+            print(f"Restauration terminée en {duration:.2f} secondes avec {len(errors)} erreur(s):")
+            for item, message in errors:
+                print(f"  - {item}: {message}")
+        else:
+            print(f"Restauration terminée avec succès en {duration:.2f} secondes")
+        return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Restaurer en parallèle une sauvegarde au format répertoire de pg_db_extractor.py')
+    parser.add_argument('--host', default=DB_HOST, help=f'Hôte du serveur PostgreSQL (défaut: {DB_HOST})')
+    parser.add_argument('--port', type=int, default=DB_PORT, help=f'Port du serveur PostgreSQL (défaut: {DB_PORT})')
+    parser.add_argument('--database', default=DB_NAME, help=f'Base de données cible (défaut: {DB_NAME})')
+    parser.add_argument('--user', default=DB_USER, help=f'Nom d\'utilisateur PostgreSQL (défaut: {DB_USER})')
+    parser.add_argument('--password', default=DB_PASSWORD, help='Mot de passe PostgreSQL')
+    parser.add_argument('--input', default=DUMP_DIR, required=DUMP_DIR is None, help='Répertoire de la sauvegarde')
+    parser.add_argument('--jobs', type=int, default=JOBS, help=f'Nombre de connexions en parallèle (défaut: {JOBS})')
+
+    args = parser.parse_args()
+
+    restorer = PostgreSQLRestorer(
+        host=args.host,
+        port=args.port,
+        database=args.database,
+        user=args.user,
+        password=args.password,
+        dump_dir=args.input,
+        jobs=args.jobs
+    )
+    if restorer.restore():
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Tests de import_transactions.py contre un cluster jetable (voir conftest.py)
+
+import csv
+from decimal import Decimal
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+import pytest
+
+import import_transactions
+from import_transactions import COLUMN_MAPPING, TransactionImporter
+
+COLUMN_TYPES = {'text': 'text', 'numeric': 'numeric(18, 4)', 'date': 'timestamp'}
+TRANSACTIONS_SQL = (
+    "CREATE TABLE transactions (id bigserial PRIMARY KEY, "
+    + ", ".join(f"{column} {COLUMN_TYPES[kind]}" for _, column, kind in COLUMN_MAPPING)
+    + ", UNIQUE (service, reference));"
+    "INSERT INTO transactions (service, reference, date_transaction) VALUES ('S9', 'R9', '2024-02-01 08:00');"
+)
+
+# Lignes des fichiers CSV (en-tête -> valeur) ; la ligne n du fichier est la n-ième + 1
+FILES = {
+    'etat_a.csv': [
+        {'Service': 'S1', 'Reférence': 'R1', 'Date': '01-02-2024 10:00:00', 'Montant': '12,5', 'Bénéficiaire': 'a\tb'},
+        {'Service': 'S1', 'Reférence': 'R2', 'Date': '2024-02-02 11:00:00', 'Montant': '7'},
+        {'Service': 'S1', 'Reférence': 'R1', 'Date': '01-02-2024 10:00:00'},
+        {'Service': 'S2', 'Reférence': '00123', 'Date': '03/02/2024 10:15', 'Montant': 'n/a'},
+        {'Service': 'S9', 'Reférence': 'R9', 'Date': '01-02-2024 09:00:00'},
+    ],
+    'etat_b.csv': [
+        {'Service': 'S1', 'Reférence': 'R3', 'Date': '05-02-2024 10:00:00', 'Statut': 'Payé "x"'},
+        {'Service': 'S1', 'Reférence': 'R2', 'Date': '02-02-2024 11:00:00', 'Montant': '7,0'},
+        {'Service': 'S1', 'Reférence': 'R4', 'Date': ''},
+    ],
+}
+
+
+@pytest.fixture
+def etats_bruts(pg_server, create_database, tmp_path, monkeypatch):
+    """Dossier des états bruts dans un HOME temporaire, base de transactions sur le cluster de test"""
+    database = create_database('import_transactions', TRANSACTIONS_SQL)
+    connect = psycopg2.connect
+
+    def connect_to_test_server(*args, **kwargs):
+        if kwargs.get('dbname') == 'db_hswa':
+            kwargs.update(pg_server, dbname=database)
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(psycopg2, 'connect', connect_to_test_server)
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+    folder = tmp_path / 'documents' / 'etats_bruts'
+    folder.mkdir(parents=True)
+    headers = [header for header, _, _ in COLUMN_MAPPING]
+    for name, rows in FILES.items():
+        with open(folder / name, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['#'] + headers)
+            for number, row in enumerate(rows, 1):
+                writer.writerow([number] + [row.get(header, '') for header in headers])
+    return folder
+
+
+def transactions(query):
+    return query('import_transactions', """
+        SELECT service, reference, montant, date_transaction, beneficiaire, statut
+        FROM transactions ORDER BY service, reference
+    """)
+
+
+def file_errors(importer, filename):
+    file_data = next(f for f in importer.report_data['files_processed'] if f['filename'] == filename)
+    return {error['row']: error['message'] for error in file_data['errors']}
+
+
+@pytest.mark.parametrize('bulk', [False, True], ids=['ligne', 'bloc'])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_skips_duplicates(etats_bruts, query, bulk, workers):
+    importer = TransactionImporter(bulk=bulk, workers=workers, chunk_rows=2)
+    importer.import_transactions()
+
+    assert importer.report_data['errors'] == []
+    assert importer.report_data['total_rows'] == 8
+    assert importer.report_data['successful_rows'] == 5
+    assert importer.report_data['failed_rows'] == 3
+    assert transactions(query) == [
+        ('S1', 'R1', Decimal('12.5000'), datetime(2024, 2, 1, 10, 0), 'a\tb', None),
+        ('S1', 'R2', Decimal('7.0000'), datetime(2024, 2, 2, 11, 0), None, None),
+        ('S1', 'R3', None, datetime(2024, 2, 5, 10, 0), None, 'Payé "x"'),
+        ('S1', 'R4', None, None, None, None),
+        # Clé gardée telle qu'écrite dans le CSV, montant invalide -> NULL
+        ('S2', '00123', None, datetime(2024, 2, 3, 10, 15), None, None),
+        ('S9', 'R9', None, datetime(2024, 2, 1, 8, 0), None, None),
+    ]
+
+    errors = file_errors(importer, 'etat_a.csv')
+    assert errors[4] == "L'opération S1 de référence R1 est en double dans le fichier (ligne 2)"
+    assert errors[6] == "L'opération S9 de référence R9 existe déjà"
+    # S1/R2 figure dans les deux fichiers : seul le second importé est en doublon
+    assert len(errors) + len(file_errors(importer, 'etat_b.csv')) == 3
+
+    # Doublons seuls : les fichiers sont déplacés dans fichiers_traités
+    assert sorted(p.name for p in (etats_bruts / 'fichiers_traités').iterdir()) == [
+        'etat_a_traité.csv', 'etat_b_traité.csv']
+    assert importer.file_keys == {}
+
+
+@pytest.mark.parametrize('bulk', [False, True], ids=['ligne', 'bloc'])
+def test_test_mode_inserts_nothing(etats_bruts, query, bulk):
+    importer = TransactionImporter(test_mode=True, bulk=bulk, chunk_rows=2)
+    importer.import_transactions()
+
+    assert transactions(query) == [('S9', 'R9', None, datetime(2024, 2, 1, 8, 0), None, None)]
+    errors = file_errors(importer, 'etat_a.csv')
+    assert errors[4] == "L'opération S1 de référence R1 est en double dans le fichier (ligne 2)"
+    assert errors[6] == "L'opération S9 de référence R9 existe déjà"
+
+
+def test_existing_keys_are_loaded_for_the_days_of_a_chunk(etats_bruts, pg_server, query):
+    query('import_transactions', """
+        INSERT INTO transactions (service, reference, date_transaction)
+        VALUES ('S5', 'ancienne', '2019-06-01 12:00'), ('S5', 'hors_periode', '2022-01-01 12:00')
+    """)
+    importer = TransactionImporter()
+    converted = import_transactions.convert_chunk(
+        pd.DataFrame({'Date': ['01-06-2019 08:00:00', '01-02-2024 23:00:00', None]}))
+
+    conn = psycopg2.connect(**pg_server, dbname='import_transactions')
+    try:
+        importer.load_existing_keys(conn, converted)
+    finally:
+        conn.close()
+    # Seuls les jours présents sont lus, pas toute la période de 2019 à 2024
+    assert importer.existing_keys == {'S5\x1fancienne', 'S9\x1fR9'}
+    assert len(importer.loaded_days) == 2
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Tests de pg_db_extractor.py contre un cluster jetable (voir conftest.py)
+
+import json
+import os
+
+import pytest
+
+import pg_db_extractor
+from pg_db_extractor import PostgreSQLExtractor
+from pg_db_restore import PostgreSQLRestorer
+
+# Clés avec % et guillemets, textes avec tabulations, retours à la ligne et
+# antislashs, octets nuls, un cycle de clés étrangères et une auto-référence
+SOURCE_SQL = r"""
+CREATE TYPE statut AS ENUM ('actif', 'clos');
+
+CREATE TABLE parent (
+    code text PRIMARY KEY,
+    libelle text,
+    statut statut
+);
+INSERT INTO parent
+SELECT 'P' || g || (ARRAY['%', '%s', '''', '%%', ''])[1 + g % 5],
+       CASE WHEN g % 4 = 0 THEN NULL ELSE E'ligne\t' || g || E'\nsuite \\ fin ''q''' END,
+       (ARRAY['actif', 'clos']::statut[])[1 + g % 2]
+FROM generate_series(1, 40) g;
+
+CREATE TABLE enfant (
+    id serial PRIMARY KEY,
+    parent_code text NOT NULL REFERENCES parent(code),
+    note text,
+    montant numeric(12, 2),
+    contenu bytea
+);
+INSERT INTO enfant (parent_code, note, montant, contenu)
+SELECT p.code, E'note \\N ' || g, g * 1.5, decode(md5(g::text), 'hex') || '\x00'::bytea
+FROM generate_series(1, 120) g
+JOIN (SELECT code, row_number() OVER (ORDER BY code) AS n FROM parent) p ON p.n = 1 + g % 40;
+
+CREATE TABLE p_x (id integer PRIMARY KEY, y_id integer);
+CREATE TABLE p_y (id integer PRIMARY KEY, x_id integer NOT NULL REFERENCES p_x(id));
+INSERT INTO p_x SELECT g, NULL FROM generate_series(1, 10) g;
+INSERT INTO p_y SELECT g, 1 + g % 10 FROM generate_series(1, 10) g;
+UPDATE p_x SET y_id = 1 + (id + 3) % 10;
+ALTER TABLE p_x ADD FOREIGN KEY (y_id) REFERENCES p_y(id);
+
+CREATE TABLE noeud (id integer PRIMARY KEY, parent_id integer REFERENCES noeud(id), x_id integer REFERENCES p_x(id));
+INSERT INTO noeud SELECT g, CASE WHEN g > 1 THEN g / 2 END, 1 + g % 10 FROM generate_series(1, 30) g;
+
+CREATE VIEW v_enfant AS SELECT parent_code, count(*) AS n FROM enfant GROUP BY parent_code;
+"""
+
+TABLES = ['parent', 'enfant', 'p_x', 'p_y', 'noeud']
+
+
+@pytest.fixture
+def source(create_database):
+    return create_database('extracteur_source', SOURCE_SQL)
+
+
+@pytest.fixture
+def extractor(pg_server, source):
+    """Crée un extracteur sur la base source ; les options sont celles du constructeur"""
+    def create(**options):
+        return PostgreSQLExtractor(**pg_server, database=source, progress=False, **options)
+
+    return create
+
+
+def table_rows(query, database, table):
+    return query(database, f"SELECT * FROM {table} ORDER BY 1")
+
+
+def assert_same_tables(query, source, target, tables=TABLES):
+    for table in tables:
+        assert table_rows(query, target, table) == table_rows(query, source, table), table
+
+
+@pytest.mark.parametrize('data_format', ['insert', 'copy'])
+@pytest.mark.parametrize('chunk_rows', [None, 7])
+def test_sql_script_round_trip(extractor, source, create_database, run_psql, query, tmp_path,
+                               data_format, chunk_rows):
+    script = tmp_path / 'dump.sql'
+    assert extractor(data_format=data_format, chunk_rows=chunk_rows, itersize=5).generate_sql_script(str(script))
+
+    target = create_database('extracteur_cible')
+    run_psql(target, script)
+    assert_same_tables(query, source, target)
+    assert query(target, "SELECT count(*) FROM v_enfant") == [(40,)]
+
+
+def test_parallel_copy_round_trip(extractor, source, create_database, run_psql, query, tmp_path):
+    script = tmp_path / 'dump.sql'
+    assert extractor(data_format='copy', jobs=3).generate_sql_script(str(script))
+
+    target = create_database('extracteur_cible')
+    run_psql(target, script)
+    assert_same_tables(query, source, target)
+
+
+def test_resume_after_interruption(extractor, source, create_database, run_psql, query, tmp_path, monkeypatch):
+    script = tmp_path / 'dump.sql'
+    copy_table_to = PostgreSQLExtractor.copy_table_to
+    calls = []
+
+    def interrupted(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 12:
+            raise KeyboardInterrupt
+        return copy_table_to(self, *args, **kwargs)
+
+    monkeypatch.setattr(PostgreSQLExtractor, 'copy_table_to', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        extractor(data_format='copy', chunk_rows=7).generate_sql_script(str(script))
+    monkeypatch.undo()
+
+    with open(str(script) + '.checkpoint.json', encoding='utf-8') as cf:
+        state = json.load(cf)
+    assert state['current'] is not None or state['tables_done']
+
+    assert extractor(data_format='copy', chunk_rows=7).generate_sql_script(str(script), resume=True)
+    target = create_database('extracteur_cible')
+    run_psql(target, script)
+    assert_same_tables(query, source, target)
+
+
+@pytest.mark.parametrize('subset', [
+    {'enfant': 'id <= 3'},
+    {'p_y': 'id = 1'},
+    {'noeud': 'id IN (17, 30)'},
+])
+def test_subset_is_closed_under_foreign_keys(extractor, source, create_database, run_psql, query, tmp_path, subset):
+    script = tmp_path / 'subset.sql'
+    assert extractor(data_format='copy', subset=subset).generate_sql_script(str(script))
+
+    # Les clés étrangères sont créées après les données : psql échouerait sur une ligne orpheline
+    target = create_database('extracteur_cible')
+    run_psql(target, script)
+    # Les lignes choisies sont toutes là, avec celles qu'elles référencent (cycle, ascendants)
+    (table, condition), = subset.items()
+    selected = f"SELECT count(*) FROM {table} WHERE {condition}"
+    assert query(target, selected) == query(source, selected)
+    assert query(target, f"SELECT count(*) FROM {table}") < query(source, f"SELECT count(*) FROM {table}")
+
+
+def test_split_script_rotates_parts(extractor, source, create_database, run_psql, query, tmp_path):
+    script = tmp_path / 'split.sql'
+    assert extractor(data_format='copy', chunk_rows=10, split_size=2048).generate_sql_script(str(script))
+
+    with open(str(script) + '.index.json', encoding='utf-8') as f:
+        index = json.load(f)
+    assert index['complete']
+    assert len(index['parts']) > 2
+    for part in index['parts']:
+        assert os.path.getsize(tmp_path / part['file']) == part['bytes']
+
+    target = create_database('extracteur_cible')
+    run_psql(target, *[tmp_path / part['file'] for part in index['parts']])
+    assert_same_tables(query, source, target)
+
+
+def test_directory_dump_reuses_unchanged_tables(extractor, source, pg_server, create_database, query, tmp_path):
+    first = tmp_path / 'premiere'
+    assert extractor(fingerprint_hash=True).generate_directory_dump(str(first))
+    query(source, "UPDATE parent SET libelle = 'modifié' WHERE code = 'P1%s'")
+
+    second = tmp_path / 'seconde'
+    assert extractor(jobs=2).generate_directory_dump(str(second), reuse_from=str(first))
+    with open(second / 'manifest.json', encoding='utf-8') as mf:
+        tables = json.load(mf)['tables']
+    assert not tables['parent'].get('reused')
+    assert all(tables[name].get('reused') for name in TABLES if name != 'parent')
+
+    assert extractor().verify_dump(str(second)) == []
+    target = create_database('extracteur_cible')
+    restorer = PostgreSQLRestorer(**pg_server, database=target, dump_dir=str(second), jobs=2)
+    assert restorer.restore() == []
+    assert_same_tables(query, source, target)
+
+
+def test_reuse_requires_a_content_hash(extractor, source, tmp_path):
+    first = tmp_path / 'premiere'
+    assert extractor().generate_directory_dump(str(first))
+
+    second = tmp_path / 'seconde'
+    assert extractor().generate_directory_dump(str(second), reuse_from=str(first))
+    with open(second / 'manifest.json', encoding='utf-8') as mf:
+        tables = json.load(mf)['tables']
+    assert not any(entry.get('reused') for entry in tables.values())
+
+
+def test_verify_detects_changed_tables(extractor, source, query, tmp_path):
+    script = tmp_path / 'dump.sql'
+    assert extractor(data_format='copy', chunk_rows=25).generate_sql_script(str(script))
+    assert extractor(jobs=2).verify_dump(str(script)) == []
+
+    query(source, "UPDATE enfant SET note = 'changée' WHERE id = 5")
+    query(source, "UPDATE p_y SET x_id = 1 WHERE id = 2")
+    assert extractor().verify_dump(str(script)) == ['enfant', 'p_y']
+
+
+def test_incremental_export_reports_tables_without_primary_key(extractor, source, query, tmp_path):
+    query(source, "CREATE TABLE journal (message text); INSERT INTO journal VALUES ('a')")
+    script = tmp_path / 'delta.sql'
+    manifest_file = tmp_path / 'watermarks.json'
+    delta = extractor()
+    assert delta.generate_delta_script(str(script), str(manifest_file))
+
+    with open(manifest_file, encoding='utf-8') as mf:
+        assert json.load(mf)['skipped_tables'] == ['journal']
+    assert delta.metrics.failed_tables() == ['journal']
+
+
+def test_strongly_connected_components_lists_referenced_tables_first():
+    graph = {'enfant': {'parent'}, 'parent': set(), 'p_x': {'p_y'}, 'p_y': {'p_x'}, 'noeud': {'noeud', 'p_x'}}
+    components = pg_db_extractor.strongly_connected_components(graph)
+    assert sorted(components) == [['enfant'], ['noeud'], ['p_x', 'p_y'], ['parent']]
+    assert components.index(['parent']) < components.index(['enfant'])
+    assert components.index(['p_x', 'p_y']) < components.index(['noeud'])